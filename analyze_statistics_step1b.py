@@ -2,17 +2,22 @@
 Analyze the largest duplicate files and pairs of folders containing duplicates.
 
 This script:
-- Loads the file index from a pickle file
+- Loads the file index written by name_size_dup_step1.py
 - Identifies the N largest duplicate file groups
 - Finds pairs of folders that contain duplicates
 - Sorts folder pairs by total duplicated data
 """
 
+import gc
+import os
 import sys
-import pickle
-from pathlib import Path
+import heapq
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
+from functools import cached_property
+from itertools import combinations
+
+from index_io import load_index
 
 # Try to import tqdm for progress bar
 try:
@@ -22,6 +27,12 @@ except ImportError:
     HAS_TQDM = False
     tqdm = None  # type: ignore
 
+# Maximum number of locations listed per group in the largest duplicates report
+MAX_PATHS_SHOWN = 50
+
+# Units used by DuplicateAnalyzer._format_bytes, each 1024 times the previous one
+_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
 
 class DuplicateAnalyzer:
     """Analyze duplicates and folder pairs from file index."""
@@ -33,17 +44,22 @@ class DuplicateAnalyzer:
         Args:
             pickle_file: Path to the pickle file from name_size_dup_step1.py
         """
+        # Both reports iterate the duplicate groups only, so files without
+        # duplicates are skipped while the index is decoded
         self.file_index = self._load_pickle(pickle_file)
+        self._duplicates = self.file_index
 
     @staticmethod
     def _load_pickle(filepath: str) -> Dict:
-        """Load the file index from pickle file."""
+        """Load the file index from the index file."""
         try:
-            with open(filepath, "rb") as f:
-                return pickle.load(f)
+            return load_index(filepath, min_count=2)
         except FileNotFoundError:
             print(f"Error: Pickle file '{filepath}' not found")
             sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
 
     def get_all_duplicates(self) -> Dict[Tuple[str, str, int], List[str]]:
         """
@@ -52,7 +68,7 @@ class DuplicateAnalyzer:
         Returns:
             Dictionary of only entries with multiple paths
         """
-        return {k: v for k, v in self.file_index.items() if len(v) > 1}
+        return self._duplicates
 
     def get_largest_duplicates(self, n: int) -> List[Tuple[Tuple[str, str, int], List[str], int]]:
         """
@@ -67,54 +83,74 @@ class DuplicateAnalyzer:
         """
         duplicates = self.get_all_duplicates()
 
-        # Calculate wasted space for each duplicate group
-        duplicate_groups = []
-        for (filename, ext, size), paths in duplicates.items():
-            if len(paths) > 1:
-                # Wasted space = size * (number_of_copies - 1)
-                wasted_bytes = size * (len(paths) - 1)
-                duplicate_groups.append(((filename, ext, size), paths, wasted_bytes))
+        # Wasted space = size * (number_of_copies - 1). Only the n largest are
+        # kept, so select them with a bounded heap instead of sorting all groups,
+        # and build the result tuples for the selected groups only
+        largest = heapq.nlargest(n, duplicates.items(),
+                                 key=lambda item: item[0][2] * (len(item[1]) - 1))
+        return [(key, paths, key[2] * (len(paths) - 1)) for key, paths in largest]
 
-        # Sort by wasted space in descending order
-        duplicate_groups.sort(key=lambda x: x[2], reverse=True)
-
-        return duplicate_groups[:n]
-
-    def get_folder_pairs(self) -> Dict[Tuple[str, str], int]:
+    def get_folder_stats(self) -> Tuple[Dict[Tuple[str, str], int], Dict[str, int]]:
         """
-        Find pairs of folders that contain duplicate files and sum their duplicated data.
+        Compute per-pair and per-folder duplicated data in a single pass.
 
         Returns:
-            Dictionary mapping folder pairs to total duplicated bytes
+            Tuple of (pair_totals, folder_totals):
+            pair_totals maps folder pairs to total duplicated bytes,
+            folder_totals maps each folder to the bytes it shares with other folders
         """
         duplicates = self.get_all_duplicates()
         folder_pairs_data = defaultdict(int)
+        folder_data = defaultdict(int)
+        # Paths come from the indexer as absolute native paths, so splitting on
+        # the last separator gives the parent folder without building Path objects
+        sep = os.sep
+        # The same folder string is rebuilt for every file it contains; interning
+        # keeps one copy and lets dict lookups short-circuit on identity
+        intern = sys.intern
+
+        # The pair loop creates millions of small tuples that all stay alive in
+        # the result, so cyclic GC passes over them would free nothing
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # Iterate over all duplicate groups
+            for (filename, ext, size), paths in duplicates.items():
+                if len(paths) <= 1:
+                    continue
+
+                # Get unique parent folders for each duplicate, sorted once so that
+                # combinations() directly yields normalized (smaller, larger) pairs
+                folders = sorted({intern(path.rpartition(sep)[0] or sep) for path in paths})
+
+                # Each folder shares one copy with every other folder of the group
+                shared_bytes = size * (len(folders) - 1)
+                for folder in folders:
+                    folder_data[folder] += shared_bytes
+
+                # Create pairs from folders (all unique combinations) and add the
+                # size of one copy (wasted space for this pair)
+                for pair in combinations(folders, 2):
+                    folder_pairs_data[pair] += size
+        finally:
+            if gc_was_enabled:
+                gc.enable()
 
-        # Iterate over all duplicate groups
-        for (filename, ext, size), paths in duplicates.items():
-            if len(paths) <= 1:
-                continue
-
-            # Get parent folders for each duplicate
-            folders = []
-            for path in paths:
-                folder = str(Path(path).parent)
-                if folder not in folders:
-                    folders.append(folder)
-
-            # Create pairs from folders (all unique combinations)
-            for i in range(len(folders)):
-                for j in range(i + 1, len(folders)):
-                    folder1 = folders[i]
-                    folder2 = folders[j]
+        return dict(folder_pairs_data), dict(folder_data)
 
-                    # Normalize pair order for consistent keys
-                    pair = tuple(sorted([folder1, folder2]))
+    def get_folder_pairs(self) -> Dict[Tuple[str, str], int]:
+        """
+        Find pairs of folders that contain duplicate files and sum their duplicated data.
 
-                    # Add the size of one copy (wasted space for this pair)
-                    folder_pairs_data[pair] += size
+        Returns:
+            Dictionary mapping folder pairs to total duplicated bytes
+        """
+        return self.get_folder_stats()[0]
 
-        return dict(folder_pairs_data)
+    @cached_property
+    def _sorted_pairs(self) -> List[Tuple[Tuple[str, str], int]]:
+        """Folder pairs sorted by total duplicated bytes in descending order (computed once)."""
+        return sorted(self.get_folder_pairs().items(), key=lambda x: x[1], reverse=True)
 
     def print_largest_duplicates(self, n: int) -> None:
         """
@@ -125,12 +161,14 @@ class DuplicateAnalyzer:
         """
         largest = self.get_largest_duplicates(n)
 
-        print("\n" + "=" * 80)
-        print(f"TOP {n} LARGEST DUPLICATE FILE GROUPS")
-        print("=" * 80)
+        out: List[str] = []
+        out.append("\n" + "=" * 80)
+        out.append(f"TOP {n} LARGEST DUPLICATE FILE GROUPS")
+        out.append("=" * 80)
 
         if not largest:
-            print("No duplicates found.")
+            out.append("No duplicates found.")
+            self._write_lines(out)
             return
 
         total_wasted = 0
@@ -138,18 +176,29 @@ class DuplicateAnalyzer:
             ext_display = f".{ext}" if ext else ""
             total_wasted += wasted_bytes
 
-            print(f"\n{idx}. {filename}{ext_display}")
-            print(f"   File size: {self._format_bytes(size)}")
-            print(f"   Number of copies: {len(paths)}")
-            print(f"   Wasted space: {self._format_bytes(wasted_bytes)}")
-            print(f"   Locations:")
-
-            for path in sorted(paths):
-                print(f"     - {path}")
-
-        print("\n" + "=" * 80)
-        print(f"Total wasted space in top {n}: {self._format_bytes(total_wasted)}")
-        print("=" * 80)
+            out.append(f"\n{idx}. {filename}{ext_display}")
+            out.append(f"   File size: {self._format_bytes(size)}")
+            out.append(f"   Number of copies: {len(paths)}")
+            out.append(f"   Wasted space: {self._format_bytes(wasted_bytes)}")
+            out.append(f"   Locations:")
+
+            # Only the selected top-n groups reach this point, so sorting the paths
+            # never runs over the whole index. Very common names (e.g. Thumbs.db)
+            # can still have huge groups, so cap the listing and select the first
+            # paths in sorted order with a bounded heap
+            if len(paths) > MAX_PATHS_SHOWN:
+                shown = heapq.nsmallest(MAX_PATHS_SHOWN, paths)
+            else:
+                shown = sorted(paths)
+            for path in shown:
+                out.append(f"     - {path}")
+            if len(paths) > len(shown):
+                out.append(f"     ... and {len(paths) - len(shown)} more")
+
+        out.append("\n" + "=" * 80)
+        out.append(f"Total wasted space in top {n}: {self._format_bytes(total_wasted)}")
+        out.append("=" * 80)
+        self._write_lines(out)
 
     def print_folder_pairs(self, top_n: int = 20) -> None:
         """
@@ -158,36 +207,36 @@ class DuplicateAnalyzer:
         Args:
             top_n: Number of top folder pairs to display
         """
-        pairs = self.get_folder_pairs()
-
-        # Sort by total duplicated bytes in descending order
-        sorted_pairs = sorted(pairs.items(), key=lambda x: x[1], reverse=True)
+        sorted_pairs = self._sorted_pairs
 
-        print("\n" + "=" * 90)
-        print(f"TOP {top_n} FOLDER PAIRS WITH DUPLICATES")
-        print("=" * 90)
+        out: List[str] = []
+        out.append("\n" + "=" * 90)
+        out.append(f"TOP {top_n} FOLDER PAIRS WITH DUPLICATES")
+        out.append("=" * 90)
 
         if not sorted_pairs:
-            print("No folder pairs with duplicates found.")
+            out.append("No folder pairs with duplicates found.")
+            self._write_lines(out)
             return
 
         total_all_pairs = sum(bytes_count for _, bytes_count in sorted_pairs)
 
-        print(f"\n{'Rank':<6} {'Duplicated Data':<20} {'Folder 1':<35} {'Folder 2':<35}")
-        print("-" * 90)
+        out.append(f"\n{'Rank':<6} {'Duplicated Data':<20} {'Folder 1':<35} {'Folder 2':<35}")
+        out.append("-" * 90)
 
         for idx, ((folder1, folder2), total_bytes) in enumerate(sorted_pairs[:top_n], 1):
             # Truncate long folder paths for display
             folder1_display = folder1 if len(folder1) <= 32 else "..." + folder1[-29:]
             folder2_display = folder2 if len(folder2) <= 32 else "..." + folder2[-29:]
 
-            print(
+            out.append(
                 f"{idx:<6} {self._format_bytes(total_bytes):<20} {folder1_display:<35} {folder2_display:<35}")
 
-        print("-" * 90)
-        print(
+        out.append("-" * 90)
+        out.append(
             f"Total duplicated data across all folder pairs: {self._format_bytes(total_all_pairs)}")
-        print("=" * 90)
+        out.append("=" * 90)
+        self._write_lines(out)
 
     def print_full_folder_pairs(self, top_n: int = 20) -> None:
         """
@@ -196,39 +245,43 @@ class DuplicateAnalyzer:
         Args:
             top_n: Number of top folder pairs to display
         """
-        pairs = self.get_folder_pairs()
+        sorted_pairs = self._sorted_pairs
 
-        # Sort by total duplicated bytes in descending order
-        sorted_pairs = sorted(pairs.items(), key=lambda x: x[1], reverse=True)
-
-        print("\n" + "=" * 100)
-        print(f"TOP {top_n} FOLDER PAIRS WITH DUPLICATES (FULL PATHS)")
-        print("=" * 100)
+        out: List[str] = []
+        out.append("\n" + "=" * 100)
+        out.append(f"TOP {top_n} FOLDER PAIRS WITH DUPLICATES (FULL PATHS)")
+        out.append("=" * 100)
 
         if not sorted_pairs:
-            print("No folder pairs with duplicates found.")
+            out.append("No folder pairs with duplicates found.")
+            self._write_lines(out)
             return
 
         total_all_pairs = sum(bytes_count for _, bytes_count in sorted_pairs)
 
         for idx, ((folder1, folder2), total_bytes) in enumerate(sorted_pairs[:top_n], 1):
-            print(f"\n{idx}. Duplicated Data: {self._format_bytes(total_bytes)}")
-            print(f"   Folder 1: {folder1}")
-            print(f"   Folder 2: {folder2}")
+            out.append(f"\n{idx}. Duplicated Data: {self._format_bytes(total_bytes)}")
+            out.append(f"   Folder 1: {folder1}")
+            out.append(f"   Folder 2: {folder2}")
 
-        print("\n" + "=" * 100)
-        print(
+        out.append("\n" + "=" * 100)
+        out.append(
             f"Total duplicated data across all folder pairs: {self._format_bytes(total_all_pairs)}")
-        print("=" * 100)
+        out.append("=" * 100)
+        self._write_lines(out)
+
+    @staticmethod
+    def _write_lines(lines: List[str]) -> None:
+        """Write report lines to stdout in a single call instead of one print per line."""
+        sys.stdout.write("\n".join(lines))
+        sys.stdout.write("\n")
 
     @staticmethod
     def _format_bytes(bytes_count: int) -> str:
         """Format bytes to human-readable format."""
-        for unit in ["B", "KB", "MB", "GB", "TB"]:
-            if bytes_count < 1024:
-                return f"{bytes_count:.2f} {unit}"
-            bytes_count /= 1024
-        return f"{bytes_count:.2f} PB"
+        # Each unit is 2**10 times the previous one, so the bit length picks it directly
+        i = min(max(bytes_count.bit_length() - 1, 0) // 10, len(_UNITS) - 1)
+        return f"{bytes_count / (1 << (10 * i)):.2f} {_UNITS[i]}"
 
 
 def print_help():
@@ -14,15 +14,35 @@ Safety features:
 import sys
 import json
 import os
+import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+
+# Try to import orjson for faster JSON parsing, fallback to the standard library
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None  # type: ignore
+
+# Try to import ijson to stream the duplicate groups, fallback to loading the whole file
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+    ijson = None  # type: ignore
 
 
 class DuplicateDeleter:
     """Delete duplicate files, keeping only the newest copy."""
 
-    def __init__(self, json_file: str, dry_run: bool = True, log_file: str = None, verbose: bool = False):
+    def __init__(self, json_file: str, dry_run: bool = True, log_file: str = None, verbose: bool = False,
+                 workers: int = 16):
         """
         Initialize the duplicate deleter.
 
@@ -31,18 +51,28 @@ class DuplicateDeleter:
             dry_run: If True, only preview deletions without actually deleting (default: True)
             log_file: Path to log file for tracking deletions. If None, creates one automatically
             verbose: If True, print all logging information to console (default: False)
+            workers: Number of threads deleting files concurrently (default: 16)
         """
         self.json_file = json_file
         self.dry_run = dry_run
         self.verbose = verbose
-        self.duplicates_data = self._load_json()
+        self.workers = workers
+        # With ijson the groups are streamed from the file on each pass, so memory
+        # stays bounded by one group; otherwise the whole document is loaded once
+        self._groups: Optional[List[Dict]] = None
+        if not (HAS_IJSON and ijson is not None):
+            self._groups = self._load_json().get("duplicates", [])
 
         # Set up logging
         if log_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             log_file = f"txt_duplicates_to_be_deleted{timestamp}.log"
         self.log_file = log_file
-        self.log_lines = []
+        # Log lines are streamed to disk so memory does not grow with the run size
+        self._log_fh = open(log_file, "w", encoding="utf-8", buffering=1 << 16)
+        # Formatted timestamp of the last second a log line was written in
+        self._ts_second = -1
+        self._ts_text = ""
 
         self._log(f"DuplicateDeleter initialized")
         self._log(f"Dry-run mode: {dry_run}")
@@ -51,34 +81,63 @@ class DuplicateDeleter:
     def _load_json(self) -> Dict:
         """Load the duplicates JSON file."""
         try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(self.json_file, "rb") as f:
+                data = f.read()
+            if HAS_ORJSON and orjson is not None:
+                return orjson.loads(data)
+            return json.loads(data)
         except FileNotFoundError:
             print(f"Error: JSON file '{self.json_file}' not found")
             sys.exit(1)
         except json.JSONDecodeError:
+            # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
             print(f"Error: Invalid JSON in '{self.json_file}'")
             sys.exit(1)
 
+    def _iter_groups(self) -> Iterator[Dict]:
+        """Yield the duplicate groups one at a time."""
+        if self._groups is not None:
+            yield from self._groups
+            return
+
+        try:
+            with open(self.json_file, "rb") as f:
+                yield from ijson.items(f, "duplicates.item")
+        except FileNotFoundError:
+            print(f"Error: JSON file '{self.json_file}' not found")
+            sys.exit(1)
+        except ijson.JSONError:
+            print(f"Error: Invalid JSON in '{self.json_file}'")
+            sys.exit(1)
+
+    def _timestamp(self) -> str:
+        """Return the current time for log lines, formatting it at most once per second."""
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_second = now
+            self._ts_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return self._ts_text
+
     def _log(self, message: str) -> None:
         """Add a message to the log. Print to console only if verbose mode is enabled."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        self.log_lines.append(log_message)
+        log_message = f"[{self._timestamp()}] {message}"
+        self._log_fh.write(log_message)
+        self._log_fh.write("\n")
         if self.verbose:
             print(log_message)
 
     def _log_and_print(self, message: str) -> None:
         """Add a message to the log and always print to console regardless of verbose setting."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        self.log_lines.append(log_message)
+        log_message = f"[{self._timestamp()}] {message}"
+        self._log_fh.write(log_message)
+        self._log_fh.write("\n")
         print(log_message)
 
     def save_log(self) -> None:
-        """Save the log to file."""
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(self.log_lines))
+        """Flush and close the log file."""
+        if self._log_fh.closed:
+            return
+        self._log_fh.close()
         print(f"\nLog saved to: {self.log_file}")
 
     def preview_deletions(self) -> Tuple[int, int]:
@@ -95,15 +154,15 @@ class DuplicateDeleter:
         total_files = 0
         total_space = 0
 
-        duplicates = self.duplicates_data.get("duplicates", [])
-
-        for idx, group in enumerate(duplicates, 1):
-            filename = group.get("filename", "")
-            extension = group.get("extension", "")
-            size_bytes = group.get("size_bytes", 0)
-            newest_index = group.get("newest_index", 0)
-            paths = group.get("paths", [])
-            dates = group.get("dates", [])
+        for idx, group in enumerate(self._iter_groups(), 1):
+            # Every group written by hash_byte_dup_step2.py has all these keys, so
+            # index directly: a missing key is a data error worth surfacing
+            filename = group["filename"]
+            extension = group["extension"]
+            size_bytes = group["size_bytes"]
+            newest_index = group["newest_index"]
+            paths = group["paths"]
+            dates = group["dates"]
 
             ext_display = f".{extension}" if extension else ""
             full_filename = f"{filename}{ext_display}"
@@ -170,43 +229,56 @@ class DuplicateDeleter:
         deleted_files = []
         failed_deletions = []
 
-        duplicates = self.duplicates_data.get("duplicates", [])
-
-        for idx, group in enumerate(duplicates, 1):
-            filename = group.get("filename", "")
-            extension = group.get("extension", "")
-            newest_index = group.get("newest_index", 0)
-            paths = group.get("paths", [])
-            size_bytes = group.get("size_bytes", 0)
-
-            ext_display = f".{extension}" if extension else ""
-            full_filename = f"{filename}{ext_display}"
-
-            self._log(f"\nProcessing group {idx}: {full_filename}")
-            self._log(f"  Keeping: {paths[newest_index]}")
-
-            # Delete all files except the newest
-            for i, path in enumerate(paths):
-                if i != newest_index:
-                    try:
-                        # Check if file exists
-                        if not os.path.exists(path):
-                            self._log(f"  SKIP (not found): {path}")
-                            continue
-
-                        # Delete the file
-                        os.remove(path)
-                        deleted_count += 1
-                        space_freed += size_bytes
-                        deleted_files.append(path)
-                        self._log(f"  DELETED: {path}")
-
-                    except PermissionError:
-                        failed_deletions.append((path, "Permission denied"))
-                        self._log(f"  ERROR (permission): {path}")
-                    except OSError as e:
-                        failed_deletions.append((path, str(e)))
-                        self._log(f"  ERROR ({e}): {path}")
+        # Groups whose header line has been logged but not all their deletions yet
+        headers_logged = set()
+
+        def report_group(idx: int, group: Dict, results: deque, finished_only: bool = False) -> None:
+            """
+            Log the outcome of the deletions submitted for one group.
+
+            Each deletion is removed from results once it is logged, so a report
+            interrupted part-way can be resumed without logging anything twice.
+            With finished_only, deletions that were cancelled before running are
+            dropped instead of waited for.
+            """
+            nonlocal deleted_count, space_freed
+            if finished_only and all(future.cancelled() for _, future in results):
+                return
+
+            if idx not in headers_logged:
+                filename = group["filename"]
+                extension = group["extension"]
+                ext_display = f".{extension}" if extension else ""
+                full_filename = f"{filename}{ext_display}"
+
+                self._log(f"\nProcessing group {idx}: {full_filename}")
+                self._log(f"  Keeping: {group['paths'][group['newest_index']]}")
+                headers_logged.add(idx)
+
+            size_bytes = group["size_bytes"]
+            while results:
+                path, future = results[0]
+                if finished_only and future.cancelled():
+                    results.popleft()
+                    continue
+                error = future.result()
+                results.popleft()
+                if error is None:
+                    deleted_count += 1
+                    space_freed += size_bytes
+                    deleted_files.append(path)
+                    self._log(f"  DELETED: {path}")
+                elif isinstance(error, FileNotFoundError):
+                    self._log(f"  SKIP (not found): {path}")
+                elif isinstance(error, PermissionError):
+                    failed_deletions.append((path, "Permission denied"))
+                    self._log(f"  ERROR (permission): {path}")
+                else:
+                    failed_deletions.append((path, str(error)))
+                    self._log(f"  ERROR ({error}): {path}")
+            headers_logged.discard(idx)
+
+        self._delete_groups(report_group)
 
         # Summary
         self._log("\n" + "=" * 70)
@@ -224,26 +296,82 @@ class DuplicateDeleter:
 
         return deleted_count, space_freed, deleted_files
 
+    def _delete_groups(self, report_group: Callable[..., None]) -> None:
+        """
+        Delete all but the newest copy of every group on a thread pool.
+
+        Deletion is bound by per-file syscall latency (not CPU) and the GIL is
+        released during the syscall, so threads keep several deletions in flight.
+        Groups are reported in order once their deletions finish; the window of
+        pending groups keeps memory bounded while the groups are streamed.
+        A group leaves the window only after it is fully reported.
+
+        Args:
+            report_group: Called with (idx, group, results) to log a group, where
+                results is a deque of (path, future) pairs; called with
+                finished_only=True for the groups still pending after an interrupt
+        """
+        pending: deque = deque()
+        max_pending = 4 * self.workers
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for idx, group in enumerate(self._iter_groups(), 1):
+                # Delete all files except the newest
+                newest_index = group["newest_index"]
+                results = deque((path, executor.submit(self._safe_remove, path))
+                                for i, path in enumerate(group["paths"]) if i != newest_index)
+                pending.append((idx, group, results))
+                if len(pending) > max_pending:
+                    report_group(*pending[0])
+                    pending.popleft()
+            while pending:
+                report_group(*pending[0])
+                pending.popleft()
+        except BaseException:
+            # Interrupted (e.g. Ctrl-C): queued deletions may already have run.
+            # Cancel the ones that have not started, wait for the running ones and
+            # log every deletion that happened, so the log stays complete for rollback
+            executor.shutdown(wait=True, cancel_futures=True)
+            for entry in pending:
+                report_group(*entry, finished_only=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _safe_remove(path: str) -> Optional[OSError]:
+        """
+        Delete a file, returning the error instead of raising it.
+
+        A missing file is reported through FileNotFoundError instead of checking
+        for existence first, which saves one syscall per file.
+
+        Args:
+            path: Path of the file to delete
+
+        Returns:
+            None if the file was deleted, otherwise the OSError raised
+        """
+        try:
+            os.remove(path)
+        except OSError as e:
+            return e
+        return None
+
     def analyze_storage_impact(self) -> None:
         """Analyze and display the storage impact of keeping only newest files."""
         self._log_and_print("\n" + "=" * 70)
         self._log_and_print("STORAGE IMPACT ANALYSIS")
         self._log_and_print("=" * 70)
 
-        duplicates = self.duplicates_data.get("duplicates", [])
-
         total_duplicate_space = 0
         total_groups = 0
         total_files_with_duplicates = 0
 
-        for group in duplicates:
-            file_count = group.get("file_count", 0)
-            size_bytes = group.get("size_bytes", 0)
-            wasted_space = group.get("wasted_space_bytes", 0)
-
+        for group in self._iter_groups():
             total_groups += 1
-            total_files_with_duplicates += file_count
-            total_duplicate_space += wasted_space
+            total_files_with_duplicates += group["file_count"]
+            total_duplicate_space += group["wasted_space_bytes"]
 
         self._log_and_print(f"Total duplicate groups: {total_groups}")
         self._log_and_print(
@@ -330,29 +458,30 @@ def main():
     deleter = DuplicateDeleter(json_file, dry_run=not execute,
                                log_file=log_file, verbose=verbose)
 
-    # Analyze storage impact
-    deleter.analyze_storage_impact()
-
-    # Preview or execute deletions
-    if execute:
-        if verbose:
-            print("\nPreparing to execute deletions...\n")
-        deleted_count, space_freed, deleted_files = deleter.delete_duplicates(
-            confirm=True)
-    else:
-        if verbose:
-            print("\nDRY-RUN MODE (preview only, no files will be deleted)\n")
-        else:
-            print("\nDRY-RUN MODE: No files will be deleted")
-        deleted_count, space_freed, deleted_files = deleter.delete_duplicates(
-            confirm=False)
-        if verbose:
-            print("\nTo actually delete files, use: --execute flag")
-        else:
-            print("Use --verbose --execute to see details and delete files")
+    try:
+        # Analyze storage impact
+        deleter.analyze_storage_impact()
 
-    # Save log
-    deleter.save_log()
+        # Preview or execute deletions
+        if execute:
+            if verbose:
+                print("\nPreparing to execute deletions...\n")
+            deleted_count, space_freed, deleted_files = deleter.delete_duplicates(
+                confirm=True)
+        else:
+            if verbose:
+                print("\nDRY-RUN MODE (preview only, no files will be deleted)\n")
+            else:
+                print("\nDRY-RUN MODE: No files will be deleted")
+            deleted_count, space_freed, deleted_files = deleter.delete_duplicates(
+                confirm=False)
+            if verbose:
+                print("\nTo actually delete files, use: --execute flag")
+            else:
+                print("Use --verbose --execute to see details and delete files")
+    finally:
+        # Save log (also when interrupted, so completed deletions stay recorded)
+        deleter.save_log()
 
 
 if __name__ == "__main__":
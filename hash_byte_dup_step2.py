@@ -1,23 +1,28 @@
 """
-Load the pickle file and find duplicate files based on
+Load the file index and find duplicate files based on
 their names and sizes.
 
 This script:
-- Loads the file index from a previously created pickle file
+- Loads the file index from a previously created index file
 - Finds groups of files with identical name and size
 - Implements two methods to compare pairs of files:
   1. Efficient byte-by-byte comparison
-  2. Hash-based comparison using SHA-256
+  2. Hash-based comparison using BLAKE3 (or SHA-256 if blake3 is not installed)
 - Identifies true duplicates and reports their locations
 """
 
+import os
 import sys
-import pickle
+import mmap
+import threading
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Tuple, Set, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Tuple, Set, Optional, Any
+
+from index_io import load_index_with_mtimes
 
 # Try to import tqdm for progress bar, fallback if not available
 try:
@@ -27,31 +32,81 @@ except ImportError:
     HAS_TQDM = False
     tqdm = None  # type: ignore
 
+# Try to import orjson for faster JSON writing, fallback to the standard library
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None  # type: ignore
+
+# Try to import blake3 for faster (SIMD, multithreaded) hashing, fallback to SHA-256
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+    blake3 = None  # type: ignore
+
+DEFAULT_HASH_ALGORITHM = "blake3" if HAS_BLAKE3 else "sha256"
+# hashlib.file_digest (Python 3.11+) avoids a Python-level loop per chunk
+HAS_FILE_DIGEST = hasattr(hashlib, "file_digest")
+# Read size for hashing and byte comparison: large chunks keep per-chunk Python overhead low
+CHUNK_SIZE = 1 << 20
+# Bytes read per file to bucket candidates before the byte-by-byte comparison
+PREFIX_SIGNATURE_SIZE = 64 * 1024
+# Asynchronous read-ahead while hashing: files hinted ahead of the one being hashed,
+# and bytes hinted per file (posix_fadvise is not available on Windows/macOS)
+HAS_FADVISE = hasattr(os, "posix_fadvise")
+PREFETCH_DEPTH = 64
+PREFETCH_BYTES = 4 << 20
+# Files at least this large are hashed from a memory map instead of being read
+MMAP_HASH_THRESHOLD = 64 * 1024
+# Files at least this large are hashed by blake3 through mmap with all cores
+BLAKE3_MMAP_THRESHOLD = 1 << 20
+
+# Per-thread read buffers reused across byte comparisons
+_thread_buffers = threading.local()
+
 
 class DuplicateFinder:
     """Find true duplicate files using multiple comparison methods."""
 
-    def __init__(self, pickle_file: str, min_file_size: int = 0):
+    def __init__(self, pickle_file: str, min_file_size: int = 0,
+                 hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                 workers: Optional[int] = None):
         """
         Initialize with a pickle file containing the file index.
 
         Args:
             pickle_file: Path to the pickle file from all_file_names.py
             min_file_size: Minimum file size in bytes to consider as duplicate (default: 0, no minimum)
+            hash_algorithm: Hash algorithm used by the hash method
+                (default: 'blake3' if installed, otherwise 'sha256')
+            workers: Number of threads hashing files concurrently
+                (default: number of CPUs)
         """
-        self.file_index = self._load_pickle(pickle_file)
-        self.hash_cache: Dict[str, str] = {}
+        # Only candidate groups (two or more files of at least min_file_size bytes) are loaded
+        self.file_index, self.mtime_cache = self._load_pickle(pickle_file, min_file_size)
+        # ISO modification dates already looked up, shared by duplicates and differences
+        self.date_cache: Dict[str, str] = {}
+        self.hash_cache: Dict[Tuple[str, str], str] = {}
+        self._hasher_templates: Dict[str, Any] = {}
         self.min_file_size = min_file_size
+        self.hash_algorithm = hash_algorithm
+        self.workers = workers or os.cpu_count() or 1
 
     @staticmethod
-    def _load_pickle(filepath: str) -> Dict:
-        """Load the file index from pickle file."""
+    def _load_pickle(filepath: str, min_file_size: int = 0) -> Tuple[Dict, Dict[str, float]]:
+        """Load the candidate groups and their scanned modification times from the index file."""
         try:
-            with open(filepath, "rb") as f:
-                return pickle.load(f)
+            return load_index_with_mtimes(filepath, min_count=2, min_size=min_file_size)
         except FileNotFoundError:
             print(f"Error: Pickle file '{filepath}' not found")
             sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
 
     def find_candidates_by_name_and_size(self) -> Dict[Tuple[str, str, int], List[str]]:
         """
@@ -74,81 +129,204 @@ class DuplicateFinder:
         return candidates
 
     @staticmethod
-    def compare_files_byte_by_byte(file1: str, file2: str, chunk_size: int = 8192) -> bool:
+    def _read_full(f, view: memoryview) -> int:
+        """Fill view from an unbuffered file, retrying short reads; returns bytes read."""
+        total = 0
+        while total < len(view):
+            n = f.readinto(view[total:])
+            if not n:
+                break
+            total += n
+        return total
+
+    @staticmethod
+    def _compare_buffers(chunk_size: int) -> Tuple[bytearray, bytearray]:
+        """
+        Return this thread's pair of read buffers for byte comparison.
+
+        Pairwise grouping compares the same files many times, so the buffers
+        are allocated once per thread instead of once per comparison.
+        """
+        buffers = getattr(_thread_buffers, "compare", None)
+        if buffers is None or len(buffers[0]) != chunk_size:
+            buffers = (bytearray(chunk_size), bytearray(chunk_size))
+            _thread_buffers.compare = buffers
+        return buffers
+
+    @staticmethod
+    def compare_files_byte_by_byte(file1: str, file2: str, chunk_size: int = CHUNK_SIZE) -> bool:
         """
         Compare two files byte-by-byte efficiently.
 
-        Reads files in chunks to minimize memory usage for large files.
+        Reads files in chunks to minimize memory usage for large files
+        (2 x chunk_size bytes of buffers, reused by each thread). Chunks are
+        read straight into the buffers, and full chunks are compared as
+        bytearrays, which is a single memcmp with no intermediate objects
+        (memoryview equality compares element by element and is several
+        times slower). Files of different sizes are rejected without reading.
         Stops reading as soon as a difference is found.
 
         Args:
             file1: Path to first file
             file2: Path to second file
-            chunk_size: Size of chunks to read at once (default 8KB)
+            chunk_size: Size of chunks to read at once (default 1MB)
 
         Returns:
             True if files are identical, False otherwise
         """
+        buf1, buf2 = DuplicateFinder._compare_buffers(chunk_size)
+        view1, view2 = memoryview(buf1), memoryview(buf2)
         try:
-            with open(file1, "rb") as f1, open(file2, "rb") as f2:
+            with open(file1, "rb", buffering=0) as f1, open(file2, "rb", buffering=0) as f2:
+                if os.fstat(f1.fileno()).st_size != os.fstat(f2.fileno()).st_size:
+                    return False
                 while True:
-                    chunk1 = f1.read(chunk_size)
-                    chunk2 = f2.read(chunk_size)
+                    n1 = DuplicateFinder._read_full(f1, view1)
+                    n2 = DuplicateFinder._read_full(f2, view2)
 
+                    if n1 != n2:
+                        return False
+                    # End of file reached: compare the partial last chunk
+                    if n1 < chunk_size:
+                        return buf1[:n1] == buf2[:n2]
                     # If chunks differ, files are not identical
-                    if chunk1 != chunk2:
+                    if buf1 != buf2:
                         return False
-
-                    # End of file reached
-                    if not chunk1:
-                        return True
         except (OSError, PermissionError):
             return False
 
-    def compute_file_hash(self, filepath: str, algorithm: str = "sha256", chunk_size: int = 8192) -> str:
+    def compute_file_hash(self, filepath: str, algorithm: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+                          multithreaded: bool = True) -> str:
         """
         Compute hash of a file using the specified algorithm.
 
         Args:
             filepath: Path to the file
-            algorithm: Hash algorithm ('sha256', 'md5', 'sha1', etc.)
-            chunk_size: Size of chunks to read at once
+            algorithm: Hash algorithm ('blake3', 'sha256', 'md5', 'sha1', etc.).
+                If None, uses the finder's hash_algorithm
+            chunk_size: Size of chunks to read at once (only used for small files on Python < 3.11)
+            multithreaded: If True, large files may be hashed on all cores (BLAKE3 only).
+                Pass False when calling from a thread pool, which already uses the cores
 
         Returns:
             Hexadecimal hash string
         """
+        if algorithm is None:
+            algorithm = self.hash_algorithm
+
         # Return cached hash if available
-        if filepath in self.hash_cache:
-            return self.hash_cache[filepath]
+        cache_key = (filepath, algorithm)
+        if cache_key in self.hash_cache:
+            return self.hash_cache[cache_key]
 
         try:
-            hasher = hashlib.new(algorithm)
-            with open(filepath, "rb") as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    hasher.update(chunk)
-
-            hash_value = hasher.hexdigest()
-            self.hash_cache[filepath] = hash_value
+            if algorithm == "blake3":
+                hash_value = self._compute_blake3(filepath, multithreaded)
+            else:
+                template = self._hasher_template(algorithm)
+                with self._open_for_stream(filepath) as f:
+                    if os.fstat(f.fileno()).st_size >= MMAP_HASH_THRESHOLD:
+                        # Hash the page cache directly, without copying through Python bytes
+                        hasher = template.copy()
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            hasher.update(mm)
+                    elif HAS_FILE_DIGEST:
+                        # C-level read loop feeding OpenSSL directly (uses SHA-NI where available)
+                        hasher = hashlib.file_digest(f, template.copy)
+                    else:
+                        hasher = template.copy()
+                        while True:
+                            chunk = f.read(chunk_size)
+                            if not chunk:
+                                break
+                            hasher.update(chunk)
+                hash_value = hasher.hexdigest()
+
+            self.hash_cache[cache_key] = hash_value
             return hash_value
         except (OSError, PermissionError):
             return ""
 
-    def compare_files_by_hash(self, file1: str, file2: str) -> bool:
+    @staticmethod
+    @contextmanager
+    def _open_for_stream(filepath: str) -> Iterator[Any]:
+        """
+        Open a file unbuffered for a single sequential read.
+
+        Where posix_fadvise is available, asks the kernel for aggressive
+        readahead while reading and to drop the file's pages afterwards: each
+        file is hashed once, so keeping it cached would only evict data that
+        is still useful.
+        """
+        with open(filepath, "rb", buffering=0) as f:
+            if HAS_FADVISE:
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+            try:
+                yield f
+            finally:
+                if HAS_FADVISE:
+                    try:
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                    except OSError:
+                        pass
+
+    def _hasher_template(self, algorithm: str) -> Any:
+        """
+        Return an empty hashlib object for the algorithm, created once.
+
+        Copying it gives a fresh hasher without resolving the algorithm name
+        and setting up a new context for every file.
+        """
+        template = self._hasher_templates.get(algorithm)
+        if template is None:
+            template = self._hasher_templates.setdefault(algorithm, hashlib.new(algorithm))
+        return template
+
+    @staticmethod
+    def _compute_blake3(filepath: str, multithreaded: bool = True) -> str:
         """
-        Compare two files using SHA-256 hash comparison.
+        Compute the BLAKE3 hash of a file (requires the blake3 package).
+
+        Args:
+            filepath: Path to the file
+            multithreaded: If True, large files are hashed on all cores; use False
+                from a thread pool to avoid oversubscribing the CPU
+
+        Returns:
+            Hexadecimal hash string
+        """
+        if os.path.getsize(filepath) >= BLAKE3_MMAP_THRESHOLD:
+            # Large files: hash the memory-mapped file with SIMD tree hashing
+            # (on all cores, unless the caller already runs one file per core)
+            if multithreaded:
+                hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            else:
+                hasher = blake3.blake3()
+            hasher.update_mmap(filepath)
+        else:
+            # Small files: a single read is cheaper than mapping and spawning threads
+            hasher = blake3.blake3()
+            with DuplicateFinder._open_for_stream(filepath) as f:
+                hasher.update(f.read())
+        return hasher.hexdigest()
+
+    def compare_files_by_hash(self, file1: str, file2: str, algorithm: Optional[str] = None) -> bool:
+        """
+        Compare two files using hash comparison.
 
         Args:
             file1: Path to first file
             file2: Path to second file
+            algorithm: Hash algorithm to use. If None, uses the finder's hash_algorithm
 
         Returns:
-            True if files have identical SHA-256 hashes, False otherwise
+            True if files have identical hashes, False otherwise
         """
-        hash1 = self.compute_file_hash(file1, "sha256")
-        hash2 = self.compute_file_hash(file2, "sha256")
+        hash1 = self.compute_file_hash(file1, algorithm)
+        hash2 = self.compute_file_hash(file2, algorithm)
 
         if not hash1 or not hash2:
             return False
@@ -178,7 +356,7 @@ class DuplicateFinder:
 
     def find_true_duplicates_hash_comparison(self) -> Dict[Tuple[str, str, int], List[List[str]]]:
         """
-        Find true duplicates using SHA-256 hash comparison.
+        Find true duplicates using hash comparison (see hash_algorithm).
 
         Returns:
             Dictionary mapping (filename, extension, size) to groups of identical files
@@ -186,49 +364,168 @@ class DuplicateFinder:
         candidates = self.find_candidates_by_name_and_size()
         true_duplicates = {}
 
-        items = list(candidates.items())
-        iterator = tqdm(items, desc="Comparing (hash)", unit=" group",
-                        disable=not HAS_TQDM) if HAS_TQDM else items
-
-        for key, paths in iterator:
-            groups = self._group_identical_files_hash(paths)
+        # A pair is settled by one byte comparison, which stops at the first
+        # difference instead of reading both files completely
+        pair_keys = [key for key, paths in candidates.items() if len(paths) == 2]
+        pair_matches = dict(zip(pair_keys, self.compare_file_pairs([candidates[key] for key in pair_keys])))
+
+        # Hash every other candidate file up front on a thread pool (hashing
+        # releases the GIL); the grouping below then only reads the hash cache
+        all_paths = list(dict.fromkeys(path for paths in candidates.values() if len(paths) > 2
+                                       for path in paths))
+        self.compute_file_hash_batch(all_paths)
+
+        for key, paths in candidates.items():
+            if len(paths) == 2:
+                groups = [list(paths)] if pair_matches[key] else []
+            else:
+                groups = self._group_identical_files_hash(paths)
             if groups:
                 true_duplicates[key] = groups
 
         return true_duplicates
 
+    def compare_file_pairs(self, pairs: List[List[str]]) -> List[bool]:
+        """
+        Compare pairs of files byte-by-byte concurrently.
+
+        Args:
+            pairs: List of [file1, file2] pairs
+
+        Returns:
+            List of booleans, True where the two files are identical
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(lambda pair: self.compare_files_byte_by_byte(*pair), pairs)
+            if HAS_TQDM:
+                results = tqdm(results, total=len(pairs), desc="Comparing pairs", unit=" pair")
+            return list(results)
+
+    def compute_file_hash_batch(self, filepaths: List[str]) -> Dict[str, str]:
+        """
+        Hash files concurrently, filling the hash cache.
+
+        Keeps many reads in flight: while a worker hashes file i it asks the
+        kernel to start reading file i + PREFETCH_DEPTH in the background
+        (on platforms with posix_fadvise), so small files are already in the
+        page cache when their turn comes.
+
+        Args:
+            filepaths: Paths of the files to hash
+
+        Returns:
+            Dictionary mapping each path to its hash ("" if it could not be read)
+        """
+        def hash_with_prefetch(i: int) -> str:
+            if HAS_FADVISE and i + PREFETCH_DEPTH < len(filepaths):
+                self._prefetch(filepaths[i + PREFETCH_DEPTH])
+            # The pool already hashes one file per worker: keep each hash single-threaded
+            return self.compute_file_hash(filepaths[i], multithreaded=False)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if HAS_FADVISE:
+                for i in range(min(PREFETCH_DEPTH, len(filepaths))):
+                    self._prefetch(filepaths[i])
+            results = executor.map(hash_with_prefetch, range(len(filepaths)))
+            if HAS_TQDM:
+                results = tqdm(results, total=len(filepaths), desc="Hashing", unit=" file")
+            # Exhaust the results before pairing them up: zip stops as soon as
+            # filepaths runs out, which would leave the progress bar unfinished
+            return dict(zip(filepaths, list(results)))
+
+    @staticmethod
+    def _prefetch(filepath: str) -> None:
+        """Ask the kernel to read the start of a file into the page cache asynchronously."""
+        try:
+            fd = os.open(filepath, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, PREFETCH_BYTES, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _short_signature(filepath: str) -> Optional[bytes]:
+        """
+        Digest of the first PREFIX_SIGNATURE_SIZE bytes of a file.
+
+        Args:
+            filepath: Path to the file
+
+        Returns:
+            Digest bytes, or None if the file could not be read
+        """
+        try:
+            with open(filepath, "rb", buffering=0) as f:
+                return hashlib.blake2b(f.read(PREFIX_SIGNATURE_SIZE), digest_size=16).digest()
+        except (OSError, PermissionError):
+            return None
+
     @staticmethod
     def _group_identical_files_byte(paths: List[str]) -> List[List[str]]:
         """Group files that are identical by byte-by-byte comparison."""
         if not paths:
             return []
 
-        groups = []
-        remaining = set(paths)
-
-        while remaining:
-            # Start a new group with the first remaining file
-            current_file = remaining.pop()
-            current_group = [current_file]
-
-            # Find all files identical to current_file
-            to_remove = set()
-            for other_file in remaining:
-                if DuplicateFinder.compare_files_byte_by_byte(current_file, other_file):
-                    current_group.append(other_file)
-                    to_remove.add(other_file)
-
-            remaining -= to_remove
-            if len(current_group) > 1:  # Only include groups with duplicates
-                groups.append(current_group)
+        # Bucket by a signature of the first bytes so that files differing early
+        # are never compared pairwise; unreadable files are left out
+        buckets: Dict[bytes, List[str]] = {}
+        for filepath in paths:
+            signature = DuplicateFinder._short_signature(filepath)
+            if signature is not None:
+                buckets.setdefault(signature, []).append(filepath)
 
+        groups = []
+        for bucket in buckets.values():
+            if len(bucket) > 1:
+                groups.extend(DuplicateFinder._group_pairwise_byte(bucket))
         return groups
 
+    @staticmethod
+    def _group_pairwise_byte(paths: List[str]) -> List[List[str]]:
+        """Group files by comparing them pairwise, byte-by-byte."""
+        # Disjoint-set forest over indices into paths
+        parent = list(range(len(paths)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int) -> None:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        for i in range(len(paths)):
+            if find(i) != i:
+                continue  # Already identical to an earlier file
+            for j in range(i + 1, len(paths)):
+                # Identity is transitive, so a file already joined to another
+                # group cannot match this one
+                if find(j) == j and DuplicateFinder.compare_files_byte_by_byte(paths[i], paths[j]):
+                    union(i, j)
+
+        groups_by_root: Dict[int, List[str]] = {}
+        for i, filepath in enumerate(paths):
+            groups_by_root.setdefault(find(i), []).append(filepath)
+
+        # Only include groups with duplicates
+        return [group for group in groups_by_root.values() if len(group) > 1]
+
     def _group_identical_files_hash(self, paths: List[str]) -> List[List[str]]:
         """Group files that are identical by hash comparison."""
         if not paths:
             return []
 
+        # Two files: one byte comparison reads less than hashing both
+        if len(paths) == 2:
+            return [list(paths)] if self.compare_files_byte_by_byte(*paths) else []
+
         # Create hash -> files mapping
         hash_groups: Dict[str, List[str]] = {}
         for filepath in paths:
@@ -241,13 +538,16 @@ class DuplicateFinder:
         # Return only groups with duplicates (more than 1 file)
         return [group for group in hash_groups.values() if len(group) > 1]
 
-    def print_duplicate_report(self, true_duplicates: Dict, method: str = "unknown") -> None:
+    def print_duplicate_report(self, true_duplicates: Dict, method: str = "unknown",
+                               key_order: Optional[Iterable[Tuple[str, str, int]]] = None) -> None:
         """
         Print a formatted report of duplicate files.
 
         Args:
             true_duplicates: Dictionary from find_true_duplicates methods
             method: Name of the comparison method used
+            key_order: Keys of true_duplicates in the order to print them
+                (default: sorted; pass a precomputed order to avoid sorting again)
         """
         if not true_duplicates:
             print(f"\nNo true duplicates found using {method} method.")
@@ -261,7 +561,11 @@ class DuplicateFinder:
         print(f"True Duplicates Found Using {method.upper()} Comparison")
         print(f"{'='*70}\n")
 
-        for (fname, ext, size), groups in sorted(true_duplicates.items()):
+        if key_order is None:
+            key_order = sorted(true_duplicates)
+        for key in key_order:
+            fname, ext, size = key
+            groups = true_duplicates[key]
             ext_display = ext if ext else "(no extension)"
             print(f"File: {fname}.{ext_display} ({size} bytes)")
 
@@ -287,7 +591,44 @@ class DuplicateFinder:
             f"  Total wasted space: {total_wasted_space:,} bytes ({total_wasted_space / (1024**2):.2f} MB)")
         print(f"{'='*70}\n")
 
-    def save_results_to_json(self, true_duplicates: Dict, differences: Dict, output_duplicates: str, output_differences: str) -> Tuple[int, int]:
+    def get_file_date(self, filepath: str) -> str:
+        """
+        Get file modification date in ISO format.
+
+        Uses the modification time recorded in the index when available and
+        only stats the file otherwise; results are memoized.
+
+        Args:
+            filepath: Path to the file
+
+        Returns:
+            ISO formatted date, or an empty string if the file cannot be accessed
+        """
+        date = self.date_cache.get(filepath)
+        if date is None:
+            mtime = self.mtime_cache.get(filepath)
+            try:
+                if mtime is None:
+                    mtime = os.stat(filepath).st_mtime
+                date = datetime.fromtimestamp(mtime).isoformat()
+            except (OSError, ValueError, OverflowError):
+                date = ""
+            self.date_cache[filepath] = date
+        return date
+
+    @staticmethod
+    def _newest_index(dates: List[str]) -> int:
+        """Index of the most recent ISO date (the first one on ties, 0 if none is known)."""
+        newest_index = 0
+        newest_date = ""
+        for i, date in enumerate(dates):
+            if date > newest_date:
+                newest_index, newest_date = i, date
+        return newest_index
+
+    def save_results_to_json(self, true_duplicates: Dict, differences: Dict, output_duplicates: str, output_differences: str,
+                             key_order: Optional[Iterable[Tuple[str, str, int]]] = None,
+                             differences_key_order: Optional[Iterable[Tuple[str, str, int]]] = None) -> Tuple[int, int]:
         """
         Save duplicate groups and differences to JSON files.
 
@@ -299,85 +640,124 @@ class DuplicateFinder:
             differences: Dictionary of files that differ
             output_duplicates: Path to output file for duplicates
             output_differences: Path to output file for differences
+            key_order: Keys of true_duplicates in output order (default: sorted)
+            differences_key_order: Keys of differences in output order (default: sorted)
 
         Returns:
             Tuple of (duplicate_groups_count, difference_groups_count)
         """
-        # Helper function to get file modification date
-        def get_file_date(filepath: str) -> str:
-            """Get file modification date in ISO format."""
-            try:
-                mtime = Path(filepath).stat().st_mtime
-                return datetime.fromtimestamp(mtime).isoformat()
-            except (OSError, FileNotFoundError):
-                return ""
-
-        # Prepare duplicates data
-        duplicates_data = []
-        for (fname, ext, size), groups in sorted(true_duplicates.items()):
-            ext_display = ext if ext else ""
-            for group_idx, group in enumerate(groups, 1):
-                sorted_group = sorted(group)
-                dates = [get_file_date(path) for path in sorted_group]
-
-                duplicates_data.append({
-                    "filename": fname,
-                    "extension": ext_display,
-                    "size_bytes": size,
-                    "group_id": group_idx,
-                    "file_count": len(sorted_group),
-                    "paths": sorted_group,
-                    "dates": dates,
-                    "newest_index": dates.index(max(dates)) if dates and any(dates) else 0,
-                    "wasted_space_bytes": size * (len(sorted_group) - 1)
-                })
-
-        # Save duplicates to JSON
-        with open(output_duplicates, "w", encoding="utf-8") as f:
-            json.dump({
-                "method": "hash-based and byte-by-byte comparison",
-                "total_groups": len(duplicates_data),
-                "total_wasted_space_bytes": sum(item["wasted_space_bytes"] for item in duplicates_data),
-                "note": "dates list corresponds to paths list (same order and length). newest_index indicates which file is most recent.",
-                "duplicates": duplicates_data
-            }, f, indent=2, ensure_ascii=False)
+        if key_order is None:
+            key_order = sorted(true_duplicates)
+        if differences_key_order is None:
+            differences_key_order = sorted(differences)
+
+        note = ("dates list corresponds to paths list (same order and length). "
+                "newest_index indicates which file is most recent.")
+
+        # Records are generated one at a time and written as they are produced,
+        # so memory use does not grow with the number of groups
+        def duplicate_records() -> Iterator[Dict[str, Any]]:
+            for key in key_order:
+                fname, ext, size = key
+                groups = true_duplicates[key]
+                ext_display = ext if ext else ""
+                for group_idx, group in enumerate(groups, 1):
+                    sorted_group = sorted(group)
+                    dates = [self.get_file_date(path) for path in sorted_group]
+
+                    yield {
+                        "filename": fname,
+                        "extension": ext_display,
+                        "size_bytes": size,
+                        "group_id": group_idx,
+                        "file_count": len(sorted_group),
+                        "paths": sorted_group,
+                        "dates": dates,
+                        "newest_index": self._newest_index(dates),
+                        "wasted_space_bytes": size * (len(sorted_group) - 1)
+                    }
+
+        duplicate_groups = sum(len(groups) for groups in true_duplicates.values())
+        write_json_stream(output_duplicates, {
+            "method": "hash-based and byte-by-byte comparison",
+            "total_groups": duplicate_groups,
+            "total_wasted_space_bytes": sum(size * (len(group) - 1)
+                                            for (_, _, size), groups in true_duplicates.items()
+                                            for group in groups),
+            "note": note,
+        }, "duplicates", duplicate_records())
 
         print(
-            f"Duplicate groups saved to: {output_duplicates} ({len(duplicates_data)} groups)")
-
-        # Prepare differences data
-        differences_data = []
-        for (fname, ext, size), groups in sorted(differences.items()):
-            ext_display = ext if ext else ""
-            for group_idx, group in enumerate(groups, 1):
-                sorted_group = sorted(group)
-                dates = [get_file_date(path) for path in sorted_group]
-
-                differences_data.append({
-                    "filename": fname,
-                    "extension": ext_display,
-                    "size_bytes": size,
-                    "group_id": group_idx,
-                    "file_count": len(sorted_group),
-                    "paths": sorted_group,
-                    "dates": dates,
-                    "newest_index": dates.index(max(dates)) if dates and any(dates) else 0
-                })
-
-        # Save differences to JSON
-        with open(output_differences, "w", encoding="utf-8") as f:
-            json.dump({
-                "method": "hash-based and byte-by-byte comparison",
-                "total_groups": len(differences_data),
-                "description": "Files with same name/extension/size but different content",
-                "note": "dates list corresponds to paths list (same order and length). newest_index indicates which file is most recent.",
-                "differences": differences_data
-            }, f, indent=2, ensure_ascii=False)
+            f"Duplicate groups saved to: {output_duplicates} ({duplicate_groups} groups)")
+
+        def difference_records() -> Iterator[Dict[str, Any]]:
+            for key in differences_key_order:
+                fname, ext, size = key
+                groups = differences[key]
+                ext_display = ext if ext else ""
+                for group_idx, group in enumerate(groups, 1):
+                    sorted_group = sorted(group)
+                    dates = [self.get_file_date(path) for path in sorted_group]
+
+                    yield {
+                        "filename": fname,
+                        "extension": ext_display,
+                        "size_bytes": size,
+                        "group_id": group_idx,
+                        "file_count": len(sorted_group),
+                        "paths": sorted_group,
+                        "dates": dates,
+                        "newest_index": self._newest_index(dates)
+                    }
+
+        difference_groups = sum(len(groups) for groups in differences.values())
+        write_json_stream(output_differences, {
+            "method": "hash-based and byte-by-byte comparison",
+            "total_groups": difference_groups,
+            "description": "Files with same name/extension/size but different content",
+            "note": note,
+        }, "differences", difference_records())
 
         print(
-            f"Difference groups saved to: {output_differences} ({len(differences_data)} groups)")
+            f"Difference groups saved to: {output_differences} ({difference_groups} groups)")
+
+        return duplicate_groups, difference_groups
 
-        return len(duplicates_data), len(differences_data)
+
+def _dumps_indented(obj: Any) -> bytes:
+    """Serialize obj as UTF-8 JSON indented by 2 spaces (orjson when available)."""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass  # e.g. undecodable file names (lone surrogates): let json report it
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def write_json_stream(filepath: str, header: Dict[str, Any], list_key: str,
+                      records: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write a JSON object whose last member is a list, one record at a time.
+
+    The output matches json.dump(..., indent=2, ensure_ascii=False) of
+    {**header, list_key: list(records)}, but the list is never built.
+
+    Args:
+        filepath: Path to the output JSON file
+        header: Members written before the list
+        list_key: Name of the list member
+        records: Iterable of the list items
+    """
+    with open(filepath, "wb") as f:
+        # Reuse the header's own serialization and reopen it to append the list
+        head = _dumps_indented(header)
+        f.write(head[:-2] + b",\n  " + _dumps_indented(list_key) + b": [")
+        separator = b"\n    "
+        for record in records:
+            f.write(separator)
+            f.write(_dumps_indented(record).replace(b"\n", b"\n    "))
+            separator = b",\n    "
+        f.write(b"\n  ]\n}" if separator != b"\n    " else b"]\n}")
 
 
 def print_help():
@@ -396,6 +776,10 @@ Arguments:
 Options:
     --method <method>        Comparison method: 'byte' or 'hash' (default: hash)
     --min-size <bytes>       Minimum file size in bytes to consider (default: 0)
+    --hash-algorithm <name>  Hash algorithm for the hash method: 'blake3', 'sha256',
+                             or any hashlib algorithm (default: blake3 if installed,
+                             otherwise sha256)
+    --workers <n>            Number of threads hashing files (default: number of CPUs)
     --output-prefix <prefix> Output file prefix (default: duplicates_results)
     --help                   Show this help message and exit
 
@@ -405,44 +789,66 @@ Examples:
     python hash_byte_dup_step2.py index.pkl --min-size 1048576
     python hash_byte_dup_step2.py index.pkl --min-size 1048576 --output-prefix results
     python hash_byte_dup_step2.py index.pkl --method byte --output-prefix my_results
+    python hash_byte_dup_step2.py index.pkl --hash-algorithm sha256
+    python hash_byte_dup_step2.py index.pkl --workers 4
 
 Notes:
     - byte method: Slower but more thorough comparison
-    - hash method: Faster using SHA-256 hashing (default)
+    - hash method: Faster using BLAKE3 hashing, or SHA-256 without blake3 (default)
+    - blake3 is optional: pip install blake3
     - --min-size is in bytes (e.g., 1048576 = 1MB)
 """
     print(help_text)
 
 
-def main():
-    """Main function to find and report duplicates."""
-    if len(sys.argv) < 2 or "--help" in sys.argv or "-h" in sys.argv:
-        print_help()
-        sys.exit(0 if "--help" in sys.argv or "-h" in sys.argv else 1)
+def _parse_args(argv: List[str]) -> Tuple[str, str, str, int, str, Optional[int]]:
+    """
+    Parse and validate the command line, exiting with an error message if it is invalid.
+
+    Args:
+        argv: Command line arguments (sys.argv)
 
-    pickle_file = sys.argv[1]
+    Returns:
+        Tuple of (pickle_file, method, output_prefix, min_file_size, hash_algorithm, workers)
+    """
+    pickle_file = argv[1]
     method = "hash"  # Default to hash method (faster)
     output_prefix = "duplicates_results"
     min_file_size = 0  # Default: no minimum size
+    hash_algorithm = DEFAULT_HASH_ALGORITHM
+    workers: Optional[int] = None  # Default: number of CPUs
 
     # Parse optional arguments
     i = 2
-    while i < len(sys.argv):
-        arg = sys.argv[i]
+    while i < len(argv):
+        arg = argv[i]
 
-        if arg == "--method" and i + 1 < len(sys.argv):
-            method = sys.argv[i + 1].lower()
+        if arg == "--method" and i + 1 < len(argv):
+            method = argv[i + 1].lower()
             i += 2
-        elif arg == "--min-size" and i + 1 < len(sys.argv):
+        elif arg == "--min-size" and i + 1 < len(argv):
             try:
-                min_file_size = int(sys.argv[i + 1])
+                min_file_size = int(argv[i + 1])
             except ValueError:
                 print(f"Error: --min-size must be an integer (bytes)")
                 print("Use --help for usage information")
                 sys.exit(1)
             i += 2
-        elif arg == "--output-prefix" and i + 1 < len(sys.argv):
-            output_prefix = sys.argv[i + 1]
+        elif arg == "--hash-algorithm" and i + 1 < len(argv):
+            hash_algorithm = argv[i + 1].lower()
+            i += 2
+        elif arg == "--workers" and i + 1 < len(argv):
+            try:
+                workers = int(argv[i + 1])
+            except ValueError:
+                workers = 0
+            if workers < 1:
+                print("Error: --workers must be a positive integer")
+                print("Use --help for usage information")
+                sys.exit(1)
+            i += 2
+        elif arg == "--output-prefix" and i + 1 < len(argv):
+            output_prefix = argv[i + 1]
             i += 2
         elif arg.startswith("--"):
             print(f"Error: Unknown option '{arg}'")
@@ -453,13 +859,48 @@ def main():
             print("Use --help for usage information")
             sys.exit(1)
 
+    _check_options(method, hash_algorithm)
+    return pickle_file, method, output_prefix, min_file_size, hash_algorithm, workers
+
+
+def _check_options(method: str, hash_algorithm: str) -> None:
+    """
+    Exit with an error message if the comparison method or hash algorithm is not usable.
+
+    Args:
+        method: Comparison method ('byte' or 'hash')
+        hash_algorithm: Hash algorithm name
+    """
     if method not in ["byte", "hash"]:
         print(f"Error: Unknown method '{method}'. Use 'byte' or 'hash'")
         print("Use --help for usage information")
         sys.exit(1)
 
+    if hash_algorithm == "blake3":
+        if not HAS_BLAKE3:
+            print("Error: --hash-algorithm blake3 requires the blake3 package (pip install blake3)")
+            sys.exit(1)
+    else:
+        try:
+            hashlib.new(hash_algorithm).hexdigest()
+        except (ValueError, TypeError):
+            # ValueError: unknown algorithm. TypeError: variable-length digests
+            # (shake_128, shake_256) need a length and cannot be used here
+            print(f"Error: Unknown or unsupported hash algorithm '{hash_algorithm}'")
+            print("Use --help for usage information")
+            sys.exit(1)
+
+
+def main():
+    """Main function to find and report duplicates."""
+    if len(sys.argv) < 2 or "--help" in sys.argv or "-h" in sys.argv:
+        print_help()
+        sys.exit(0 if "--help" in sys.argv or "-h" in sys.argv else 1)
+
+    pickle_file, method, output_prefix, min_file_size, hash_algorithm, workers = _parse_args(sys.argv)
+
     print(f"Loading file index from: {pickle_file}")
-    finder = DuplicateFinder(pickle_file, min_file_size)
+    finder = DuplicateFinder(pickle_file, min_file_size, hash_algorithm, workers)
 
     if min_file_size > 0:
         size_mb = min_file_size / (1024 * 1024)
@@ -476,10 +917,12 @@ def main():
         print("Running BYTE-BY-BYTE comparison...")
         true_dups = finder.find_true_duplicates_byte_comparison()
     else:  # hash
-        print("Running HASH-BASED comparison...")
+        print(f"Running HASH-BASED comparison ({hash_algorithm})...")
         true_dups = finder.find_true_duplicates_hash_comparison()
 
-    finder.print_duplicate_report(true_dups, method.upper())
+    # Sort the keys once; the report and the JSON output list groups in this order
+    dup_key_order = sorted(true_dups)
+    finder.print_duplicate_report(true_dups, method.upper(), dup_key_order)
 
     # Find files that differ (candidates that are not duplicates)
     differences = {}
@@ -504,7 +947,8 @@ def main():
     output_diff_file = f"{output_prefix}_differences.json"
 
     dup_groups_count, diff_groups_count = finder.save_results_to_json(true_dups, differences,
-                                                                      output_dups_file, output_diff_file)
+                                                                      output_dups_file, output_diff_file,
+                                                                      dup_key_order)
 
     print(f"\nResults saved successfully!")
 
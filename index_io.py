@@ -0,0 +1,295 @@
+"""
+Read and write the file index in a compact, schema-specific binary format.
+
+The index maps (filename, extension, size) to a list of full paths. Its
+shape is fixed, so it does not need the generality of pickle. The file is
+stored column-wise:
+- Header: magic bytes, format version, group count, path count, text length
+- Sizes of all groups as a block of little-endian int64 values
+- Number of paths of each group as a block of little-endian int64 values
+- (version 2) Modification time of each path as a block of little-endian
+  float64 values, in the same order as the paths below (NaN if unknown)
+- All filenames, then all extensions, then all paths (group by group),
+  joined by NUL characters and encoded as UTF-8
+
+Each column is decoded with a single C-level call and the dictionary is
+assembled with zip(), so loading avoids the per-opcode work of the
+unpickler and cannot execute arbitrary code. Index files written by older
+versions with pickle are still accepted.
+
+The whole file may optionally be compressed with zstd (requires the
+zstandard package) or gzip; load_index detects the compression from the
+leading magic bytes.
+"""
+
+import gc
+import sys
+import gzip
+import zlib
+import struct
+import pickle
+from array import array
+from itertools import accumulate, chain, compress, repeat
+from typing import Dict, List, Optional, Tuple, Union
+
+# Try to import zstandard for fast compression, fallback to gzip if not available
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+    zstandard = None  # type: ignore
+
+_MAGIC = b"HDIDX\x00"
+_VERSION = 2
+# Version 1 files have no modification time column
+_SUPPORTED_VERSIONS = (1, 2)
+# magic, version, number of groups, number of paths, length of the text block
+_HEADER = struct.Struct("<6sHQQQ")
+# NUL cannot appear in file names or paths on any supported platform
+_SEPARATOR = "\0"
+# Keep undecodable file names (surrogate-escaped by the OS layer) round-tripping
+_ENCODING_ERRORS = "surrogatepass"
+# Leading bytes of a zstd frame and of a gzip member
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_GZIP_MAGIC = b"\x1f\x8b"
+COMPRESSIONS = ("zstd", "gzip")
+DEFAULT_COMPRESSION = "zstd" if HAS_ZSTD else "gzip"
+
+
+def _int64_array(values) -> array:
+    """Build an int64 array stored in little-endian order."""
+    data = array("q", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+
+def _float64_array(values) -> array:
+    """Build a float64 array stored in little-endian order."""
+    data = array("d", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+
+def save_index(filepath: str, index: Dict[Tuple[str, str, int], List[str]],
+               compression: Optional[str] = None,
+               mtimes: Optional[Dict[str, float]] = None,
+               singles: Optional[Dict[Tuple[str, str, int], str]] = None) -> None:
+    """
+    Save the file index to a binary index file.
+
+    Args:
+        filepath: Path to the output index file
+        index: Dictionary mapping (filename, extension, size) to lists of paths
+        compression: None (default) to write uncompressed, 'zstd' or 'gzip'
+        mtimes: Optional dictionary mapping paths to modification times
+            (seconds since the epoch); paths without an entry are stored as unknown
+        singles: Optional dictionary mapping (filename, extension, size) to the
+            single path of groups with one file, stored after the groups of index
+            (keys must not also be in index)
+
+    Raises:
+        ValueError: If the compression is unknown or zstd is requested without zstandard
+    """
+    if compression not in (None,) + COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'")
+    if compression == "zstd" and not HAS_ZSTD:
+        raise ValueError("zstd compression requires the zstandard package (pip install zstandard)")
+
+    if singles is None:
+        singles = {}
+    sizes = _int64_array(size for (_, _, size) in chain(index, singles))
+    counts = _int64_array(chain((len(paths) for paths in index.values()), repeat(1, len(singles))))
+
+    if mtimes is None:
+        mtimes = {}
+    nan = float("nan")
+    mtime_column = _float64_array(mtimes.get(path, nan) for path in
+                                  chain(chain.from_iterable(index.values()), singles.values()))
+
+    n_groups = len(index) + len(singles)
+    strings: List[str] = [fname for (fname, _, _) in chain(index, singles)]
+    strings.extend(ext for (_, ext, _) in chain(index, singles))
+    for paths in index.values():
+        strings.extend(paths)
+    strings.extend(singles.values())
+    text = _SEPARATOR.join(strings).encode("utf-8", _ENCODING_ERRORS)
+
+    with open(filepath, "wb") as raw:
+        if compression == "zstd":
+            f = zstandard.ZstdCompressor(threads=-1).stream_writer(raw)
+        elif compression == "gzip":
+            # Level 1: several times faster than the default for a modest size cost
+            f = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1)
+        else:
+            f = raw
+        f.write(_HEADER.pack(_MAGIC, _VERSION, n_groups, len(strings) - 2 * n_groups,
+                             len(text)))
+        f.write(sizes.tobytes())
+        f.write(counts.tobytes())
+        f.write(mtime_column.tobytes())
+        f.write(text)
+        if f is not raw:
+            f.close()
+
+
+def load_index(filepath: str, min_count: int = 1,
+               min_size: int = 0) -> Dict[Tuple[str, str, int], List[str]]:
+    """
+    Load the file index from a binary index file (or a legacy pickle file).
+
+    Groups can be filtered while decoding, so the lists and keys of groups
+    the caller does not need (e.g. files without duplicates) are never built.
+
+    Args:
+        filepath: Path to the index file
+        min_count: Only load groups with at least this many paths (default: 1, all)
+        min_size: Only load groups whose file size is at least this many bytes (default: 0)
+
+    Returns:
+        Dictionary mapping (filename, extension, size) to lists of paths
+
+    Raises:
+        ValueError: If the file is truncated, has an unsupported version, or is
+            zstd-compressed and zstandard is not installed
+    """
+    return _load(filepath, False, min_count, min_size)[0]
+
+
+def load_index_with_mtimes(filepath: str, min_count: int = 1, min_size: int = 0
+                           ) -> Tuple[Dict[Tuple[str, str, int], List[str]], Dict[str, float]]:
+    """
+    Load the file index together with the modification times recorded by the scan.
+
+    Args:
+        filepath: Path to the index file
+        min_count: Only load groups with at least this many paths (default: 1, all)
+        min_size: Only load groups whose file size is at least this many bytes (default: 0)
+
+    Returns:
+        Tuple of (index, mtimes): the dictionary returned by load_index and a
+        dictionary mapping the loaded paths to modification times. Paths whose
+        time is unknown (including every path of older index files) are left out
+
+    Raises:
+        ValueError: Same conditions as load_index
+    """
+    return _load(filepath, True, min_count, min_size)
+
+
+def _read_payload(filepath: str) -> Union[bytes, Dict[Tuple[str, str, int], List[str]]]:
+    """
+    Read an index file, decompressing it if needed.
+
+    Args:
+        filepath: Path to the index file
+
+    Returns:
+        The uncompressed contents of the file, or the dictionary itself for
+        an index pickled by an older version of name_size_dup_step1.py
+
+    Raises:
+        ValueError: If the compressed data is corrupted, or is zstd-compressed
+            and zstandard is not installed
+    """
+    with open(filepath, "rb", buffering=1 << 20) as f:
+        head = f.peek(len(_MAGIC))[:len(_MAGIC)]
+        if head.startswith(_ZSTD_MAGIC):
+            if not HAS_ZSTD:
+                raise ValueError(f"Index file '{filepath}' is zstd-compressed; "
+                                 "install zstandard to read it (pip install zstandard)")
+            try:
+                with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                    return reader.read()
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Index file '{filepath}' is truncated or corrupted ({e})") from e
+        elif head.startswith(_GZIP_MAGIC):
+            try:
+                return gzip.decompress(f.read())
+            except (EOFError, OSError, zlib.error) as e:
+                raise ValueError(f"Index file '{filepath}' is truncated or corrupted ({e})") from e
+        elif head != _MAGIC:
+            # Index written by an older version of name_size_dup_step1.py
+            return pickle.load(f)
+        return f.read()
+
+
+def _load(filepath: str, with_mtimes: bool, min_count: int, min_size: int
+          ) -> Tuple[Dict[Tuple[str, str, int], List[str]], Dict[str, float]]:
+    """Load the (filtered) index and, if requested, the path -> modification time dictionary."""
+    filtered = min_count > 1 or min_size > 0
+    data = _read_payload(filepath)
+    if isinstance(data, dict):
+        if filtered:
+            data = {key: paths for key, paths in data.items()
+                    if len(paths) >= min_count and key[2] >= min_size}
+        return data, {}
+
+    if len(data) < _HEADER.size or not data.startswith(_MAGIC):
+        raise ValueError(f"Index file '{filepath}' is truncated or corrupted")
+    magic, version, n_groups, n_paths, text_len = _HEADER.unpack_from(data)
+    if version not in _SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported index format version {version} in '{filepath}'")
+    offset = _HEADER.size
+    mtimes_len = 8 * n_paths if version >= 2 else 0
+    if len(data) != offset + 16 * n_groups + mtimes_len + text_len:
+        raise ValueError(f"Index file '{filepath}' is truncated or corrupted")
+
+    sizes = array("q")
+    sizes.frombytes(data[offset:offset + 8 * n_groups])
+    offset += 8 * n_groups
+    counts = array("q")
+    counts.frombytes(data[offset:offset + 8 * n_groups])
+    offset += 8 * n_groups
+    mtime_column = array("d")
+    if with_mtimes:
+        mtime_column.frombytes(data[offset:offset + mtimes_len])
+    offset += mtimes_len
+    if sys.byteorder != "little":
+        sizes.byteswap()
+        counts.byteswap()
+        mtime_column.byteswap()
+
+    if n_groups == 0:
+        return {}, {}
+    strings = data[offset:].decode("utf-8", _ENCODING_ERRORS).split(_SEPARATOR)
+    del data
+    if len(strings) != 2 * n_groups + n_paths:
+        raise ValueError(f"Index file '{filepath}' is truncated or corrupted")
+
+    names = strings[:n_groups]
+    # A few distinct extensions repeat across millions of groups: share one object each
+    exts = list(map(sys.intern, strings[n_groups:2 * n_groups]))
+    paths = strings[2 * n_groups:]
+    del strings
+
+    # Building millions of lists would otherwise trigger repeated cyclic GC
+    # passes that cannot free anything
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        keys = zip(names, exts, sizes)
+        if filtered:
+            mask = [count >= min_count and size >= min_size for count, size in zip(counts, sizes)]
+            keys = compress(keys, mask)
+            spans = [(end - count, end)
+                     for end, count in compress(zip(accumulate(counts), counts), mask)]
+        else:
+            spans = [(end - count, end) for end, count in zip(accumulate(counts), counts)]
+        index = dict(zip(keys, [paths[start:end] for start, end in spans]))
+
+        # NaN marks an unknown time and is the only value not equal to itself
+        if not with_mtimes:
+            mtimes = {}
+        elif filtered:
+            mtimes = {path: mtime for start, end in spans
+                      for path, mtime in zip(paths[start:end], mtime_column[start:end])
+                      if mtime == mtime}
+        else:
+            mtimes = {path: mtime for path, mtime in zip(paths, mtime_column) if mtime == mtime}
+        return index, mtimes
+    finally:
+        if gc_was_enabled:
+            gc.enable()
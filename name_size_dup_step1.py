@@ -9,12 +9,16 @@ This script:
 - Handles inaccessible files gracefully
 """
 
+import os
 import sys
-import pickle
-from pathlib import Path
-from collections import defaultdict
+import queue
+import threading
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional, Any
 
+from index_io import save_index, load_index_with_mtimes, DEFAULT_COMPRESSION
+
 # Try to import tqdm for progress bar, fallback if not available
 try:
     from tqdm import tqdm
@@ -29,57 +33,184 @@ class FileIndex:
 
     def __init__(self):
         """Initialize the file index with a nested dictionary structure."""
+        # Most files are unique, so a key seen once keeps its single path as a
+        # plain string; it only gets a list when a second occurrence arrives
+        # Structure: {(filename, extension, size): path}
+        self.first_seen: Dict[Tuple[str, str, int], str] = {}
         # Structure: {(filename, extension, size): [path1, path2, ...]}
-        self.index: Dict[Tuple[str, str, int], List[str]] = defaultdict(list)
+        self.dups: Dict[Tuple[str, str, int], List[str]] = {}
+        # Modification time of each path of a duplicate key, recorded from the
+        # scan's stat so that later steps do not need to stat the files again
+        # (unique files are never compared, so their times are not kept)
+        self.mtimes: Dict[str, float] = {}
 
-    def scan_directory(self, folder_path: str) -> None:
+    def scan_directory(self, folder_path: str, workers: int = 16) -> None:
         """
         Recursively scan a directory and index all files.
 
+        Directories are scanned concurrently by a pool of threads (os.scandir
+        releases the GIL), each filling its own dictionary; the dictionaries
+        are merged into the index at the end.
+
         Args:
             folder_path: Root directory to scan
+            workers: Number of threads scanning directories (default: 16)
         """
-        root = Path(folder_path)
-
-        file_count = 0
         pbar: Optional[Any] = None
         if HAS_TQDM and tqdm is not None:
             pbar = tqdm(unit=" files", desc="Scanning", dynamic_ncols=True)
+        pbar_lock = threading.Lock()
+
+        # Directories waiting to be scanned; None tells a worker to stop
+        pending: "queue.Queue[Optional[str]]" = queue.Queue()
+        # Set when the scan ends early: workers then drop the directories still queued
+        stop = threading.Event()
+
+        pending.put(os.path.abspath(folder_path))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                try:
+                    for _ in range(workers):
+                        futures.append(executor.submit(self._scan_worker, pending, stop, pbar, pbar_lock))
+                    pending.join()
+                finally:
+                    # Always release the workers, also when interrupted while
+                    # starting or waiting for them, or the executor would wait
+                    # for them forever
+                    stop.set()
+                    for _ in range(workers):
+                        pending.put(None)
+                local_indexes = [future.result() for future in futures]
+        finally:
+            if pbar is not None:
+                pbar.close()
+
+        for local_index, _ in local_indexes:
+            self.merge(local_index)
+        scanned_mtimes = ChainMap(*(local_mtimes for _, local_mtimes in local_indexes))
+        self.mtimes.update((path, scanned_mtimes[path]) for paths in self.dups.values() for path in paths)
+        # Thread scheduling decides the merge order; sort for reproducible output
+        for paths in self.dups.values():
+            paths.sort()
+
+    @staticmethod
+    def _scan_worker(pending: "queue.Queue[Optional[str]]", stop: threading.Event,
+                     pbar: Optional[Any], pbar_lock: threading.Lock) -> Tuple["FileIndex", Dict[str, float]]:
+        """
+        Scan directories from the queue until told to stop.
+
+        Args:
+            pending: Queue of directories to scan; None tells the worker to stop
+            stop: Event set when the remaining queued directories should be skipped
+            pbar: Progress bar to update with the number of files found, or None
+            pbar_lock: Lock serializing the progress bar updates
 
-        def scan_recursive(path):
-            """Recursively scan a directory with error handling."""
-            nonlocal file_count, pbar
+        Returns:
+            Tuple of (index, mtimes) of the files this worker found
+        """
+        local_index = FileIndex()
+        local_mtimes: Dict[str, float] = {}
+        while True:
+            path = pending.get()
+            if path is None:
+                return local_index, local_mtimes
             try:
-                for item in path.iterdir():
+                if stop.is_set():
+                    continue
+                file_count = FileIndex._scan_one(path, pending, local_index, local_mtimes)
+                if pbar is not None and file_count:
+                    with pbar_lock:
+                        pbar.update(file_count)
+            finally:
+                pending.task_done()
+
+    @staticmethod
+    def _scan_one(path: str, pending: "queue.Queue[Optional[str]]", local_index: "FileIndex",
+                  local_mtimes: Dict[str, float]) -> int:
+        """Index the files of one directory and queue its subdirectories."""
+        file_count = 0
+        try:
+            # DirEntry caches the file type (and on Windows the stat result)
+            # from the directory read, saving syscalls per entry
+            with os.scandir(path) as entries:
+                for entry in entries:
                     # Skip hidden files and directories
-                    if item.name.startswith("."):
+                    if entry.name.startswith("."):
                         continue
 
                     try:
-                        if item.is_file():
+                        # Symbolic links are not followed, so a link is never
+                        # reported as a duplicate of its own target
+                        if entry.is_file(follow_symlinks=False):
                             # Extract file info
-                            filename = item.name
-                            extension = item.suffix[1:] if item.suffix else ""
-                            file_size = item.stat().st_size
+                            filename = entry.name
+                            stem, _, extension = filename.rpartition(".")
+                            # Extensions repeat across most files: share one string each
+                            extension = sys.intern(extension) if stem else ""
+                            stat_result = entry.stat(follow_symlinks=False)
 
                             # Create key and store full path
-                            key = (filename, extension, file_size)
-                            self.index[key].append(str(item.absolute()))
+                            key = (filename, extension, stat_result.st_size)
+                            # The root is absolute, so entry.path is already the full path
+                            local_index.add(key, entry.path)
+                            local_mtimes[entry.path] = stat_result.st_mtime
                             file_count += 1
-                            if pbar is not None:
-                                pbar.update(1)
-                        elif item.is_dir():
-                            scan_recursive(item)
+                        elif entry.is_dir(follow_symlinks=False):
+                            pending.put(entry.path)
                     except (OSError, PermissionError):
                         # Skip inaccessible files and directories
                         continue
-            except (OSError, PermissionError):
-                # Skip inaccessible directories
-                pass
+        except (OSError, PermissionError):
+            # Skip inaccessible directories
+            pass
+        return file_count
 
-        scan_recursive(root)
-        if pbar is not None:
-            pbar.close()
+    def add(self, key: Tuple[str, str, int], path: str) -> None:
+        """
+        Add one file to the index.
+
+        Args:
+            key: (filename, extension, size) of the file
+            path: Full path of the file
+        """
+        paths = self.dups.get(key)
+        if paths is not None:
+            paths.append(path)
+            return
+        first = self.first_seen.pop(key, None)
+        if first is None:
+            self.first_seen[key] = path
+        else:
+            self.dups[key] = [first, path]
+
+    def merge(self, other: "FileIndex") -> None:
+        """
+        Add all files of another index (without its modification times).
+
+        Args:
+            other: Index to merge into this one
+        """
+        if not self.first_seen and not self.dups:
+            self.first_seen = dict(other.first_seen)
+            self.dups = {key: list(paths) for key, paths in other.dups.items()}
+            return
+        for key, path in other.first_seen.items():
+            self.add(key, path)
+        for key, paths in other.dups.items():
+            existing = self.dups.get(key)
+            if existing is not None:
+                existing.extend(paths)
+            else:
+                first = self.first_seen.pop(key, None)
+                self.dups[key] = ([first] if first is not None else []) + paths
+
+    @property
+    def index(self) -> Dict[Tuple[str, str, int], List[str]]:
+        """All groups as (filename, extension, size) -> paths, built on demand."""
+        merged = {key: [path] for key, path in self.first_seen.items()}
+        merged.update(self.dups)
+        return merged
 
     def get_locations(self, filename: str, extension: str = "", size: Optional[int] = None) -> List[str]:
         """
@@ -94,10 +225,14 @@ class FileIndex:
             List of full paths to matching files
         """
         matches = []
-        for (fname, ext, fsize), paths in self.index.items():
+        for (fname, ext, fsize), paths in self.dups.items():
             if fname == filename and ext == extension:
                 if size is None or fsize == size:
                     matches.extend(paths)
+        for (fname, ext, fsize), path in self.first_seen.items():
+            if fname == filename and ext == extension:
+                if size is None or fsize == size:
+                    matches.append(path)
         return matches
 
     def get_all_duplicates(self) -> Dict[Tuple[str, str, int], List[str]]:
@@ -107,7 +242,7 @@ class FileIndex:
         Returns:
             Dictionary of only entries with multiple paths
         """
-        return {k: v for k, v in self.index.items() if len(v) > 1}
+        return dict(self.dups)
 
     def get_file_info(self, filename: str, extension: str = "", size: Optional[int] = None) -> Dict:
         """
@@ -136,9 +271,9 @@ class FileIndex:
         Args:
             verbosity: Verbosity level (0=summary only, 1=show duplicate names, 2=show names with paths)
         """
-        total_files = sum(len(paths) for paths in self.index.values())
-        unique_combos = len(self.index)
-        duplicates = sum(1 for paths in self.index.values() if len(paths) > 1)
+        total_files = sum(len(paths) for paths in self.dups.values()) + len(self.first_seen)
+        unique_combos = len(self.dups) + len(self.first_seen)
+        duplicates = len(self.dups)
 
         print(f"\nFile Index Summary:")
         print(f"  Total files indexed: {total_files}")
@@ -153,27 +288,30 @@ class FileIndex:
                     for path in sorted(paths):
                         print(f"    {path}")
 
-    def save_to_pickle(self, filepath: str) -> None:
+    def save_to_pickle(self, filepath: str, compression: Optional[str] = None) -> None:
         """
-        Save the index dictionary to a pickle file.
+        Save the index dictionary to an index file (see index_io.py for the format).
 
         Args:
-            filepath: Path to the output pickle file
+            filepath: Path to the output index file
+            compression: None (default) to write uncompressed, 'zstd' or 'gzip'
         """
-        with open(filepath, "wb") as f:
-            pickle.dump(dict(self.index), f)
+        save_index(filepath, self.dups, compression, self.mtimes, singles=self.first_seen)
         print(f"\nIndex saved to: {filepath}")
 
     def load_from_pickle(self, filepath: str) -> None:
         """
-        Load the index dictionary from a pickle file.
+        Load the index dictionary from an index file or a legacy pickle file.
 
         Args:
-            filepath: Path to the input pickle file
+            filepath: Path to the input index file
         """
-        with open(filepath, "rb") as f:
-            data = pickle.load(f)
-            self.index = defaultdict(list, data)
+        index, mtimes = load_index_with_mtimes(filepath)
+        self.first_seen = {key: paths[0] for key, paths in index.items() if len(paths) == 1}
+        self.dups = {key: paths for key, paths in index.items() if len(paths) > 1}
+        # Older index files also store the times of unique files: drop them
+        self.mtimes = {path: mtimes[path] for paths in self.dups.values() for path in paths
+                       if path in mtimes}
         print(f"\nIndex loaded from: {filepath}")
 
 
@@ -185,13 +323,16 @@ Usage: python name_size_dup_step1.py <folder_path> [OPTIONS]
 Description:
     Create an efficient data structure for mapping (filename, extension, size) to file paths.
     Recursively scans all files in a given directory and creates an index.
-    A pickle file is always saved with the default name 'index.pkl' unless overridden.
+    An index file is always saved with the default name 'index.pkl' unless overridden.
 
 Arguments:
     folder_path              Root directory to scan
 
 Options:
-    --save-pickle <file>     Save the index to a custom pickle filename (default: index.pkl)
+    --save-pickle <file>     Save the index to a custom filename (default: index.pkl)
+    --workers <n>            Number of threads scanning directories (default: 16)
+    --compress               Compress the index file (zstd if the zstandard package
+                             is installed, otherwise gzip); read back transparently
     -v                       Verbosity level 1: Show duplicate file names
     -vv                      Verbosity level 2: Show duplicate file names with full paths
     --help                   Show this help message and exit
@@ -200,6 +341,7 @@ Examples:
     python name_size_dup_step1.py C:\\my\\folder
     python name_size_dup_step1.py C:\\my\\folder --save-pickle custom.pkl
     python name_size_dup_step1.py C:\\my\\folder -v
+    python name_size_dup_step1.py C:\\my\\folder --workers 4
     python name_size_dup_step1.py C:\\my\\folder -vv --save-pickle custom.pkl
 """
     print(help_text)
@@ -215,6 +357,8 @@ def main():
     folder_to_scan = None
     save_pickle_file = "index.pkl"  # Default pickle filename
     verbosity = 0  # 0=silent, 1=names, 2=with paths
+    workers = 16
+    compression = None
 
     i = 1
     while i < len(sys.argv):
@@ -223,6 +367,19 @@ def main():
         if arg == "--save-pickle" and i + 1 < len(sys.argv):
             save_pickle_file = sys.argv[i + 1]
             i += 2
+        elif arg == "--workers" and i + 1 < len(sys.argv):
+            try:
+                workers = int(sys.argv[i + 1])
+            except ValueError:
+                workers = 0
+            if workers < 1:
+                print("Error: --workers must be a positive integer")
+                print("Use --help for usage information")
+                sys.exit(1)
+            i += 2
+        elif arg == "--compress":
+            compression = DEFAULT_COMPRESSION
+            i += 1
         elif arg == "-vv":
             verbosity = 2
             i += 1
@@ -251,13 +408,13 @@ def main():
 
     # Scan directory
     print(f"Scanning directory: {folder_to_scan}")
-    file_index.scan_directory(folder_to_scan)
+    file_index.scan_directory(folder_to_scan, workers)
 
     # Print summary
     file_index.print_summary(verbosity=verbosity)
 
-    # Always save to pickle with default or specified filename
-    file_index.save_to_pickle(save_pickle_file)
+    # Always save the index with default or specified filename
+    file_index.save_to_pickle(save_pickle_file, compression)
 
 
 if __name__ == "__main__":
@@ -13,37 +13,137 @@ Safety features:
 - Progress bar showing recovery status
 """
 
+import re
 import sys
 import json
 import os
+import mmap
+import stat
+import errno
 import shutil
+import pickle
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from tqdm import tqdm
 
+# Try to import orjson for faster JSON parsing, fallback to the standard library
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None  # type: ignore
+
+# Try to import ijson to stream the duplicate groups, fallback to loading the whole file
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+    ijson = None  # type: ignore
+
+# Asynchronous read-ahead of upcoming copy sources: groups hinted ahead of the one
+# being copied, and bytes hinted per source (posix_fadvise is not available on Windows/macOS)
+HAS_FADVISE = hasattr(os, "posix_fadvise")
+PREFETCH_DEPTH = 64
+PREFETCH_BYTES = 4 << 20
+
+# In-kernel copy primitives (Linux); elsewhere files are copied with shutil.copy2
+HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+HAS_SENDFILE = hasattr(os, "sendfile")
+# Bytes requested per copy_file_range/sendfile call
+COPY_BLOCK_SIZE = 1 << 30
+# Files at least this large with several copies to recover are read once and written
+# to all copies (in chunks of TEE_CHUNK_SIZE bytes); smaller sources stay in the page
+# cache between copies, so they keep the in-kernel copy path
+TEE_MIN_SIZE = 64 << 20
+TEE_CHUNK_SIZE = 1 << 20
+# Errors meaning "this primitive cannot copy between these files", not an I/O failure
+_UNSUPPORTED_COPY_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                            errno.ENOTSUP, errno.EBADF, errno.ETXTBSY}
+
+
+@dataclass
+class PlannedGroup:
+    """A duplicate group selected for recovery."""
+    full_filename: str
+    size_bytes: int
+    # Newest copy, copied back to the targets
+    source: str
+    source_date: Optional[str]
+    # (path, original date) of each file to recover
+    targets: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class RecoveryPlan:
+    """Groups selected for recovery, in file order, with the totals over their files."""
+    groups: List[PlannedGroup] = field(default_factory=list)
+    total_files: int = 0
+    total_space: int = 0
+
+
+@dataclass
+class RecoveryProgress:
+    """Totals of the copies reported so far, and the progress bar, while a recovery is executed."""
+    recovered_count: int = 0
+    space_restored: int = 0
+    skipped_count: int = 0
+    recovered_files: List[str] = field(default_factory=list)
+    # (path, error message) of each failed copy
+    failed_recoveries: List[Tuple[str, str]] = field(default_factory=list)
+    bar: Optional[Any] = None
+    # Groups whose header line has been logged but not all their copies yet
+    headers_logged: Set[int] = field(default_factory=set)
+
 
 class DuplicateRecoverer:
     """Recover deleted duplicate files by copying the newest copy back."""
 
-    def __init__(self, json_file: str, search_string: str = None, dry_run: bool = True, log_file: str = None, verbose: bool = False, recover_all: bool = False):
+    def __init__(self, json_file: str, search_string: str = None, dry_run: bool = True, log_file: str = None, verbose: bool = False, recover_all: bool = False,
+                 use_cache: bool = False, workers: int = 16):
         """
         Initialize the duplicate recoverer.
 
         Args:
             json_file: Path to the duplicates JSON file from hash_byte_dup_step2.py
-            search_string: String to search for in file paths (case-insensitive). Ignored if recover_all is True.
+            search_string: String to search for in file paths (case-insensitive); several strings
+                can be given separated by commas. Ignored if recover_all is True.
             dry_run: If True, only preview recoveries without making changes (default: True)
             log_file: Path to log file for tracking recoveries. If None, creates one automatically
             verbose: If True, print all logging information to console (default: False)
             recover_all: If True, recover all duplicate files without filtering (default: False)
+            use_cache: If True, keep the parsed groups in a cache file next to the JSON file
+                and reuse it on later runs while the JSON file is unchanged (default: False)
+            workers: Number of threads copying files concurrently (default: 16)
         """
         self.json_file = json_file
         self.search_string = search_string.lower() if search_string else None
+        # Several comma-separated search strings are matched with one compiled
+        # pattern, so each path is scanned once however many strings there are
+        self._search_re = None
+        if self.search_string and "," in self.search_string:
+            terms = [term for term in self.search_string.split(",") if term]
+            if terms:
+                self._search_re = re.compile("|".join(map(re.escape, terms)))
         self.dry_run = dry_run
         self.verbose = verbose
         self.recover_all = recover_all
-        self.duplicates_data = self._load_json()
+        self.workers = workers
+        # With ijson the groups are streamed from the file on each pass, so memory
+        # stays bounded by one group; otherwise the whole document is loaded once
+        self._groups: Optional[List[Dict]] = None
+        self._cache_path = json_file + ".parsed.pkl"
+        if use_cache:
+            self._groups = self._load_cached_groups()
+        elif not (HAS_IJSON and ijson is not None):
+            self._groups = self._share_repeated_strings(self._load_duplicates())
 
         # Set up logging
         if log_file is None:
@@ -53,7 +153,11 @@ class DuplicateRecoverer:
             else:
                 log_file = f"txt_recovered_files_{search_string}_{timestamp}.log"
         self.log_file = log_file
-        self.log_lines = []
+        # Log lines are streamed to disk so memory does not grow with the run size
+        self._log_fh = open(log_file, "w", encoding="utf-8", buffering=1 << 16)
+        # Formatted timestamp of the last second a log line was written in
+        self._ts_second = -1
+        self._ts_text = ""
 
         self._log(f"DuplicateRecoverer initialized")
         self._log(f"Dry-run mode: {dry_run}")
@@ -66,62 +170,262 @@ class DuplicateRecoverer:
     def _load_json(self) -> Dict:
         """Load the duplicates JSON file."""
         try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(self.json_file, "rb") as f:
+                data = f.read()
+            if HAS_ORJSON and orjson is not None:
+                return orjson.loads(data)
+            return json.loads(data)
         except FileNotFoundError:
             print(f"Error: JSON file '{self.json_file}' not found")
             sys.exit(1)
         except json.JSONDecodeError:
+            # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
             print(f"Error: Invalid JSON in '{self.json_file}'")
             sys.exit(1)
 
+    def _load_duplicates(self) -> List[Dict]:
+        """
+        Load the list of duplicate groups, parsing only the "duplicates" array when possible.
+
+        hash_byte_dup_step2.py writes the array as the last member of the top-level
+        object, so it is cut out of the memory-mapped file and parsed alone,
+        skipping the other members. Any other layout, or a slice that does not
+        parse on its own (e.g. a nested "duplicates" key matched first), falls
+        back to _load_json, which reports genuinely invalid JSON.
+
+        Returns:
+            List of duplicate groups
+        """
+        try:
+            with open(self.json_file, "rb") as f:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty file: let _load_json report it
+                    mm = None
+                if mm is not None:
+                    with mm:
+                        span = self._duplicates_span(mm)
+                        if span is not None:
+                            view = memoryview(mm)[span[0]:span[1]]
+                            try:
+                                if HAS_ORJSON and orjson is not None:
+                                    groups = orjson.loads(view)
+                                else:
+                                    groups = json.loads(bytes(view))
+                            except json.JSONDecodeError:
+                                # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+                                groups = None
+                            finally:
+                                view.release()
+                            if isinstance(groups, list):
+                                return groups
+        except FileNotFoundError:
+            print(f"Error: JSON file '{self.json_file}' not found")
+            sys.exit(1)
+        return self._load_json().get("duplicates", [])
+
+    @staticmethod
+    def _duplicates_span(data: mmap.mmap) -> Optional[Tuple[int, int]]:
+        """
+        Locate the "duplicates" array when it is the last member of the top-level object.
+
+        Args:
+            data: Contents of the JSON file
+
+        Returns:
+            (start, end) byte offsets of the array, or None if the layout differs
+        """
+        key = data.find(b'"duplicates"')
+        if key <= 0 or data[key - 1:key].strip() not in (b"", b"{", b","):
+            return None
+        start = data.find(b"[", key)
+        # Only the colon (and whitespace) may separate the key from the array
+        if start < 0 or start - key > 64 or data[key + 12:start].strip() != b":":
+            return None
+        end = data.rfind(b"]")
+        # Only the closing brace of the top-level object may follow the array
+        if end < start or data[end + 1:].strip() != b"}":
+            return None
+        return start, end + 1
+
+    def _load_cached_groups(self) -> List[Dict]:
+        """
+        Load the duplicate groups from the cache file, or parse the JSON file and cache them.
+
+        The cache records the size and modification time of the JSON file it was
+        built from and is ignored (and rewritten) when they no longer match.
+
+        Returns:
+            List of duplicate groups
+        """
+        try:
+            json_stat = os.stat(self.json_file)
+        except FileNotFoundError:
+            print(f"Error: JSON file '{self.json_file}' not found")
+            sys.exit(1)
+        signature = (json_stat.st_size, json_stat.st_mtime_ns)
+
+        try:
+            with open(self._cache_path, "rb") as f:
+                cached_signature, groups = pickle.load(f)
+            if cached_signature == signature:
+                return groups
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            # Missing or unreadable cache: rebuild it
+            pass
+
+        groups = self._share_repeated_strings(self._load_duplicates())
+        tmp_path = self._cache_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((signature, groups), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write cache file '{self._cache_path}': {e}")
+        return groups
+
+    @staticmethod
+    def _share_repeated_strings(groups: List[Dict]) -> List[Dict]:
+        """
+        Make groups held in memory share one object per distinct extension.
+
+        A few extensions repeat across all groups; the parser creates a new
+        string for each occurrence. Shared strings are also stored only once
+        in the pickled cache.
+
+        Args:
+            groups: Duplicate groups loaded from the JSON file (modified in place)
+
+        Returns:
+            The same list of groups
+        """
+        for group in groups:
+            extension = group.get("extension")
+            if isinstance(extension, str):
+                group["extension"] = sys.intern(extension)
+        return groups
+
+    def _iter_groups(self) -> Iterator[Dict]:
+        """Yield the duplicate groups one at a time."""
+        if self._groups is not None:
+            yield from self._groups
+            return
+
+        try:
+            with open(self.json_file, "rb") as f:
+                yield from ijson.items(f, "duplicates.item")
+        except FileNotFoundError:
+            print(f"Error: JSON file '{self.json_file}' not found")
+            sys.exit(1)
+        except ijson.JSONError:
+            print(f"Error: Invalid JSON in '{self.json_file}'")
+            sys.exit(1)
+
+    def _timestamp(self) -> str:
+        """Return the current time for log lines, formatting it at most once per second."""
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_second = now
+            self._ts_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return self._ts_text
+
     def _log(self, message: str) -> None:
         """Add a message to the log. Print to console only if verbose mode is enabled."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        self.log_lines.append(log_message)
+        log_message = f"[{self._timestamp()}] {message}"
+        self._log_fh.write(log_message)
+        self._log_fh.write("\n")
         if self.verbose:
             print(log_message)
 
     def _log_and_print(self, message: str) -> None:
         """Add a message to the log and always print to console regardless of verbose setting."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        self.log_lines.append(log_message)
+        log_message = f"[{self._timestamp()}] {message}"
+        self._log_fh.write(log_message)
+        self._log_fh.write("\n")
         print(log_message)
 
     def save_log(self) -> None:
-        """Save the log to file."""
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(self.log_lines))
+        """Flush and close the log file."""
+        if self._log_fh.closed:
+            return
+        self._log_fh.close()
         print(f"\nLog saved to: {self.log_file}")
 
-    def _filter_matching_groups(self) -> List[Dict]:
+    def _matches(self, text: str) -> bool:
+        """Return True if the lowercased text contains the search string (or one of them)."""
+        if self._search_re is not None:
+            return self._search_re.search(text) is not None
+        return self.search_string in text
+
+    def _filter_matching_groups(self) -> Iterator[Tuple[Dict, Optional[List[str]]]]:
+        """
+        Filter duplicate groups. If recover_all is True, yield all groups.
+        Otherwise, yield groups where at least one path contains the search string.
+
+        Yields:
+            (group, paths_lower) for the duplicate groups that match the criteria,
+            in file order. paths_lower holds the group's paths lowercased, so the
+            caller can match them one by one without lowercasing them again
+            (None if recover_all is True); it is not kept on the group
+        """
+        if self.recover_all:
+            for group in self._iter_groups():
+                yield group, None
+            return
+
+        for group in self._iter_groups():
+            paths_lower = [path.lower() for path in group.get("paths", [])]
+            # Check if any path contains the search string with a single C-level scan
+            # (NUL cannot appear in paths or in a command-line search string)
+            if self._matches("\0".join(paths_lower)):
+                yield group, paths_lower
+
+    def build_plan(self) -> RecoveryPlan:
         """
-        Filter duplicate groups. If recover_all is True, return all groups.
-        Otherwise, return groups where at least one path contains the search string.
+        Select the groups and files to recover in a single pass over the duplicate groups.
+
+        The plan is shared by analyze_recovery_impact, preview_recoveries and
+        recover_duplicates, so the JSON file is read and filtered only once.
 
         Returns:
-            List of duplicate groups that match the criteria
+            RecoveryPlan with the matching groups (in file order) and their totals
         """
-        duplicates = self.duplicates_data.get("duplicates", [])
-
-        if self.recover_all:
-            return duplicates
+        plan = RecoveryPlan()
 
-        matching_groups = []
-        for group in duplicates:
+        for group, paths_lower in self._filter_matching_groups():
+            filename = group.get("filename", "")
+            extension = group.get("extension", "")
+            size_bytes = group.get("size_bytes", 0)
+            newest_index = group.get("newest_index", 0)
             paths = group.get("paths", [])
-            # Check if any path contains the search string
-            if any(self.search_string in path.lower() for path in paths):
-                matching_groups.append(group)
+            dates = group.get("dates", [])
 
-        return matching_groups
+            ext_display = f".{extension}" if extension else ""
+            planned = PlannedGroup(
+                full_filename=f"{filename}{ext_display}",
+                size_bytes=size_bytes,
+                source=paths[newest_index],
+                source_date=dates[newest_index] if newest_index < len(dates) else None)
 
-    def preview_recoveries(self) -> Tuple[int, int]:
+            # Recover all files except the newest (that match search string or if recover_all)
+            for i, path in enumerate(paths):
+                if i != newest_index and (self.recover_all or self._matches(paths_lower[i])):
+                    planned.targets.append((path, dates[i] if i < len(dates) else ""))
+
+            plan.groups.append(planned)
+            plan.total_files += len(planned.targets)
+            plan.total_space += len(planned.targets) * size_bytes
+
+        return plan
+
+    def preview_recoveries(self, plan: RecoveryPlan) -> Tuple[int, int]:
         """
         Preview all files that would be recovered.
 
+        Args:
+            plan: Recovery plan from build_plan
+
         Returns:
             Tuple of (total_files_to_recover, total_space_to_restore_bytes)
         """
@@ -129,9 +433,7 @@ class DuplicateRecoverer:
         self._log("PREVIEW: Files that would be recovered")
         self._log("=" * 70)
 
-        matching_groups = self._filter_matching_groups()
-
-        if not matching_groups:
+        if not plan.groups:
             if self.recover_all:
                 self._log(f"\nNo duplicate groups found")
             else:
@@ -140,56 +442,33 @@ class DuplicateRecoverer:
             self._log("=" * 70)
             return 0, 0
 
-        total_files = 0
-        total_space = 0
+        for idx, planned in enumerate(plan.groups, 1):
+            self._log(f"\nGroup {idx}: {planned.full_filename} ({planned.size_bytes} bytes)")
+            self._log(f"  Source (newest): {planned.source}")
+            if planned.source_date is not None:
+                self._log(f"    Modified: {planned.source_date}")
 
-        for idx, group in enumerate(matching_groups, 1):
-            filename = group.get("filename", "")
-            extension = group.get("extension", "")
-            size_bytes = group.get("size_bytes", 0)
-            newest_index = group.get("newest_index", 0)
-            paths = group.get("paths", [])
-            dates = group.get("dates", [])
-
-            ext_display = f".{extension}" if extension else ""
-            full_filename = f"{filename}{ext_display}"
-
-            self._log(f"\nGroup {idx}: {full_filename} ({size_bytes} bytes)")
-            self._log(f"  Source (newest): {paths[newest_index]}")
-            if newest_index < len(dates):
-                self._log(f"    Modified: {dates[newest_index]}")
-
-            # List files to be recovered
-            files_to_recover = []
-            for i, path in enumerate(paths):
-                if i != newest_index:
-                    # Check if this path should be recovered
-                    if self.recover_all or self.search_string in path.lower():
-                        files_to_recover.append(
-                            (path, dates[i] if i < len(dates) else ""))
-                        total_files += 1
-                        total_space += size_bytes
-
-            if files_to_recover:
-                self._log(f"  Recovering ({len(files_to_recover)} copies):")
-                for path, date in files_to_recover:
+            if planned.targets:
+                self._log(f"  Recovering ({len(planned.targets)} copies):")
+                for path, date in planned.targets:
                     self._log(f"    - {path}")
                     if date:
                         self._log(f"      Original date: {date}")
 
         self._log("\n" + "=" * 70)
-        self._log(f"SUMMARY: {total_files} files would be recovered")
+        self._log(f"SUMMARY: {plan.total_files} files would be recovered")
         self._log(
-            f"Total space to restore: {total_space:,} bytes ({total_space / (1024**2):.2f} MB)")
+            f"Total space to restore: {plan.total_space:,} bytes ({plan.total_space / (1024**2):.2f} MB)")
         self._log("=" * 70)
 
-        return total_files, total_space
+        return plan.total_files, plan.total_space
 
-    def recover_duplicates(self, confirm: bool = True) -> Tuple[int, int, List[str]]:
+    def recover_duplicates(self, plan: RecoveryPlan, confirm: bool = True) -> Tuple[int, int, List[str]]:
         """
         Recover duplicate files by copying the newest copy to all other paths.
 
         Args:
+            plan: Recovery plan from build_plan
             confirm: If True, ask for confirmation before recovering
 
         Returns:
@@ -197,13 +476,13 @@ class DuplicateRecoverer:
         """
         if self.dry_run:
             self._log("\nDRY-RUN MODE: No files will be recovered")
-            preview_files, preview_space = self.preview_recoveries()
+            preview_files, preview_space = self.preview_recoveries(plan)
             return preview_files, preview_space, []
 
         # Ask for confirmation
         if confirm:
             print("\n" + "=" * 70)
-            preview_files, preview_space = self.preview_recoveries()
+            preview_files, preview_space = self.preview_recoveries(plan)
             print("=" * 70)
             response = input("\nProceed with recovery? (yes/no): ").strip().lower()
             if response != "yes":
@@ -214,100 +493,525 @@ class DuplicateRecoverer:
         self._log("EXECUTING: Recovering duplicate files")
         self._log("=" * 70)
 
-        recovered_count = 0
-        space_restored = 0
-        recovered_files = []
-        failed_recoveries = []
+        progress = RecoveryProgress()
+        # Create progress bar (disabled in verbose mode to avoid clutter)
+        progress.bar = tqdm(total=plan.total_files, desc="Recovering files", unit="file",
+                            disable=self.verbose)
+        try:
+            self._copy_groups(plan, progress)
+        finally:
+            progress.bar.close()
 
-        matching_groups = self._filter_matching_groups()
+        # Summary
+        self._log("\n" + "=" * 70)
+        self._log("SUMMARY:")
+        self._log(f"  Files recovered: {progress.recovered_count}")
+        self._log(
+            f"  Space restored: {progress.space_restored:,} bytes ({progress.space_restored / (1024**2):.2f} MB)")
+        if progress.skipped_count:
+            self._log(f"  Files skipped (already up to date): {progress.skipped_count}")
 
-        # Count total files to recover for progress bar
-        total_files_to_recover = 0
-        for group in matching_groups:
-            paths = group.get("paths", [])
-            newest_index = group.get("newest_index", 0)
-            for i, path in enumerate(paths):
-                if i != newest_index and (self.recover_all or self.search_string in path.lower()):
-                    total_files_to_recover += 1
+        if progress.failed_recoveries:
+            self._log(f"  Failed recoveries: {len(progress.failed_recoveries)}")
+            for path, error in progress.failed_recoveries:
+                self._log(f"    - {path}: {error}")
 
-        # Create progress bar (disabled in verbose mode to avoid clutter)
-        progress_bar = tqdm(total=total_files_to_recover, desc="Recovering files", unit="file",
-                            disable=self.verbose)
+        self._log("=" * 70)
 
-        for idx, group in enumerate(matching_groups, 1):
-            filename = group.get("filename", "")
-            extension = group.get("extension", "")
-            newest_index = group.get("newest_index", 0)
-            paths = group.get("paths", [])
-            size_bytes = group.get("size_bytes", 0)
+        return progress.recovered_count, progress.space_restored, progress.recovered_files
 
-            ext_display = f".{extension}" if extension else ""
-            full_filename = f"{filename}{ext_display}"
+    def _copy_groups(self, plan: RecoveryPlan, progress: RecoveryProgress) -> None:
+        """
+        Copy the sources of all planned groups to their targets on a thread pool.
+
+        Copying is bound by I/O, and the GIL is released during the copy syscalls,
+        so threads keep several copies in flight. Groups are reported in order once
+        their copies finish; the window of pending groups bounds the work queued.
+        A group leaves the window only after it is fully reported.
+
+        Args:
+            plan: Recovery plan from build_plan
+            progress: Totals and progress bar, updated as the groups are reported
+        """
+        # Parent directories known to exist (or created) so far
+        known_dirs: Set[str] = set()
+        pending: deque = deque()
+        max_pending = 4 * self.workers
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            # Stat all sources concurrently up front: on network filesystems the
+            # latency of one stat per group would otherwise be paid serially
+            source_stats = executor.map(self._stat_or_none, [planned.source for planned in plan.groups])
+            # Copy the groups in the on-disk order of their sources (approximated by
+            # device and inode number) so source reads are as sequential as possible;
+            # groups keep their plan number in the log
+            entries = sorted(zip(range(1, len(plan.groups) + 1), plan.groups, source_stats),
+                             key=self._source_order)
+            for idx, planned, src_stat in self._prefetched(entries):
+                pending.append((idx, planned, self._submit_group(executor, planned, src_stat, known_dirs)))
+                if len(pending) > max_pending:
+                    self._report_group(*pending[0], progress)
+                    pending.popleft()
+            while pending:
+                self._report_group(*pending[0], progress)
+                pending.popleft()
+        except BaseException:
+            # Interrupted (e.g. Ctrl-C): queued copies may already have run.
+            # Cancel the ones that have not started, wait for the running ones and
+            # log every copy that happened, so completed recoveries stay recorded
+            executor.shutdown(wait=True, cancel_futures=True)
+            for entry in pending:
+                self._report_group(*entry, progress, finished_only=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    def _submit_group(self, executor: ThreadPoolExecutor, planned: PlannedGroup,
+                      src_stat: Optional[os.stat_result], known_dirs: Set[str]) -> Optional[deque]:
+        """
+        Create the missing directories of a group and submit its copies.
+
+        Args:
+            executor: Pool running the copies
+            planned: Group to copy
+            src_stat: Result of os.stat on the source, or None if it was not found
+            known_dirs: Parent directories known to exist so far (updated)
+
+        Returns:
+            Deque of [path, created directory, outcome, position] entries, one per
+            target, where outcome is the future of the copy (position is the
+            index of the target in the result of a tee copy) or a (skipped,
+            error) tuple; None if the source was not found
+        """
+        # Check if source file exists; the stat is reused for every copy of the group
+        if src_stat is None:
+            return None
+
+        results: deque = deque()
+        to_copy = []
+        for path, _ in planned.targets:
+            # Create parent directory if it doesn't exist (here, in order, so
+            # concurrent copies never race to create the same directory).
+            # Each directory is checked once per run, however many files go in it
+            created_dir = None
+            parent_dir = os.path.dirname(path)
+            try:
+                if parent_dir and parent_dir not in known_dirs:
+                    if not os.path.exists(parent_dir):
+                        os.makedirs(parent_dir, exist_ok=True)
+                        created_dir = parent_dir
+                    known_dirs.add(parent_dir)
+            except OSError as e:
+                results.append([path, created_dir, (False, e), None])
+                continue
+            entry = [path, created_dir, None, None]
+            results.append(entry)
+            to_copy.append(entry)
+
+        if (len(to_copy) > 1 and src_stat.st_size >= TEE_MIN_SIZE
+                and stat.S_ISREG(src_stat.st_mode)):
+            # Large file with several copies: read it once and write every copy
+            # from the same buffer, instead of reading it again for each copy
+            future = executor.submit(self._tee_copy, planned.source,
+                                     [entry[0] for entry in to_copy], src_stat)
+            for position, entry in enumerate(to_copy):
+                entry[2] = future
+                entry[3] = position
+        else:
+            for entry in to_copy:
+                entry[2] = executor.submit(self._safe_copy, planned.source, entry[0], src_stat)
+        return results
+
+    def _report_group(self, idx: int, planned: PlannedGroup, results: Optional[deque],
+                      progress: RecoveryProgress, finished_only: bool = False) -> None:
+        """
+        Log the outcome of the copies submitted for one group.
+
+        Each copy is removed from results once it is logged, so a report
+        interrupted part-way can be resumed without logging anything twice.
+        With finished_only, copies that were cancelled before running are
+        dropped instead of waited for (directories created for them are still
+        logged).
+        """
+        if results is None:
+            self._log(f"\nGroup {idx}: {planned.full_filename}")
+            self._log(f"  ERROR: Source file not found: {planned.source}")
+            return
+        if finished_only and all(created_dir is None and not isinstance(outcome, tuple) and outcome.cancelled()
+                                 for _, created_dir, outcome, _ in results):
+            return
+
+        if idx not in progress.headers_logged:
+            self._log(f"\nGroup {idx}: {planned.full_filename}")
+            self._log(f"  Source: {planned.source}")
+            progress.headers_logged.add(idx)
+
+        reported = len(results)
+        while results:
+            path, created_dir, outcome, position = results[0]
+            if isinstance(outcome, tuple):
+                copy_result = outcome
+            elif finished_only and outcome.cancelled():
+                copy_result = None
+            elif position is None:
+                copy_result = outcome.result()
+            else:
+                copy_result = outcome.result()[position]
+            results.popleft()
+            if created_dir is not None:
+                self._log(f"  MKDIR: {created_dir}")
+            if copy_result is not None:
+                self._log_copy_outcome(path, planned.size_bytes, *copy_result, progress)
+        progress.headers_logged.discard(idx)
+        # One progress update per group: tqdm's per-call bookkeeping adds up with small files
+        progress.bar.update(reported)
+
+    def _log_copy_outcome(self, path: str, size_bytes: int, skipped: bool,
+                          error: Optional[OSError], progress: RecoveryProgress) -> None:
+        """Log the outcome of one copy and add it to the totals."""
+        if skipped:
+            progress.skipped_count += 1
+            self._log(f"  SKIP (up to date): {path}")
+        elif error is None:
+            progress.recovered_count += 1
+            progress.space_restored += size_bytes
+            progress.recovered_files.append(path)
+            self._log(f"  RECOVERED: {path}")
+        elif isinstance(error, PermissionError):
+            progress.failed_recoveries.append((path, "Permission denied"))
+            self._log(f"  ERROR (permission): {path}")
+        else:
+            progress.failed_recoveries.append((path, str(error)))
+            self._log(f"  ERROR ({error}): {path}")
+
+    @staticmethod
+    def _stat_or_none(path: str) -> Optional[os.stat_result]:
+        """Return os.stat(path), or None if the file does not exist or cannot be stat'ed."""
+        try:
+            return os.stat(path)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def _safe_copy(cls, src: str, dst: str, src_stat: os.stat_result) -> Tuple[bool, Optional[OSError]]:
+        """
+        Copy a file with _copy_with_stat, returning the error instead of raising it.
 
-            source_path = paths[newest_index]
+        A destination that already has the size and modification time of the
+        source (e.g. copied by an interrupted earlier run) is left alone.
 
-            # Check if source file exists
-            if not os.path.exists(source_path):
-                self._log(f"\nGroup {idx}: {full_filename}")
-                self._log(f"  ERROR: Source file not found: {source_path}")
+        Args:
+            src: Path of the file to copy
+            dst: Path of the copy
+            src_stat: Result of os.stat(src)
+
+        Returns:
+            Tuple of (skipped, error): skipped is True if the destination was
+            already up to date; error is the OSError raised, or None
+        """
+        if cls._is_up_to_date(dst, src_stat):
+            return True, None
+
+        try:
+            cls._copy_with_stat(src, dst, src_stat)
+        except OSError as e:
+            return False, e
+        return False, None
+
+    @classmethod
+    def _tee_copy(cls, src: str, dsts: List[str], src_stat: os.stat_result
+                  ) -> List[Tuple[bool, Optional[OSError]]]:
+        """
+        Copy one file to several destinations, reading it only once.
+
+        Each chunk of the source is written to every destination before the
+        next chunk is read. Destinations that are already up to date are
+        skipped, and a failing destination does not stop the others. If the
+        number of bytes read differs from the size in src_stat (the source
+        changed while being copied), the copies are redone with shutil.copy2.
+
+        Args:
+            src: Path of the file to copy
+            dsts: Paths of the copies
+            src_stat: Result of os.stat(src)
+
+        Returns:
+            (skipped, error) for each destination, as returned by _safe_copy
+        """
+        outcomes: List[Optional[Tuple[bool, Optional[OSError]]]] = [None] * len(dsts)
+        pending = []
+        for i, dst in enumerate(dsts):
+            if cls._is_up_to_date(dst, src_stat):
+                outcomes[i] = (True, None)
+            else:
+                pending.append(i)
+        if not pending:
+            return outcomes
+
+        # Open the source before touching any destination: if it vanished or became
+        # unreadable since it was stat'ed, the existing destinations must stay intact
+        try:
+            src_file = open(src, "rb", buffering=0)
+        except OSError as e:
+            for i in pending:
+                outcomes[i] = (False, e)
+            return outcomes
+
+        with src_file:
+            fds = cls._open_destinations(dsts, pending, outcomes)
+            copied = -1
+            try:
+                copied = cls._tee_chunks(src_file, fds, outcomes)
+            except OSError as e:
+                # The source could not be read: every copy still open is incomplete
+                for i in fds:
+                    outcomes[i] = (False, e)
+            finally:
+                cls._close_destinations(fds, outcomes)
+
+        for i, dst in enumerate(dsts):
+            if outcomes[i] is not None:
                 continue
+            try:
+                if copied == src_stat.st_size:
+                    cls._copy_metadata(dst, src_stat)
+                else:
+                    # The source changed size while it was read: copy it again as a whole
+                    shutil.copy2(src, dst)
+                outcomes[i] = (False, None)
+            except OSError as e:
+                outcomes[i] = (False, e)
+        return outcomes
+
+    @staticmethod
+    def _open_destinations(dsts: List[str], pending: List[int],
+                           outcomes: List[Optional[Tuple[bool, Optional[OSError]]]]) -> Dict[int, int]:
+        """
+        Open (and truncate) the destinations of a tee copy for writing.
 
-            self._log(f"\nGroup {idx}: {full_filename}")
-            self._log(f"  Source: {source_path}")
+        Args:
+            dsts: Paths of the copies
+            pending: Indexes in dsts of the copies to write
+            outcomes: Outcome of each copy; set for the destinations that cannot be opened
 
-            # Recover all files except the newest (that match search string or if recover_all)
-            for i, path in enumerate(paths):
-                if i != newest_index and (self.recover_all or self.search_string in path.lower()):
+        Returns:
+            Dictionary mapping the index of each opened destination to its file descriptor
+        """
+        fds: Dict[int, int] = {}
+        for i in pending:
+            try:
+                fds[i] = os.open(dsts[i], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            except OSError as e:
+                outcomes[i] = (False, e)
+        return fds
+
+    @staticmethod
+    def _tee_chunks(src_file: BinaryIO, fds: Dict[int, int],
+                    outcomes: List[Optional[Tuple[bool, Optional[OSError]]]]) -> int:
+        """
+        Write the rest of the source to every open destination, chunk by chunk.
+
+        A destination that fails to be written is closed, removed from fds and
+        given its error in outcomes; the others go on.
+
+        Args:
+            src_file: Unbuffered source file
+            fds: Index -> file descriptor of each destination still being written
+            outcomes: Outcome of each copy
+
+        Returns:
+            Number of bytes read from the source
+
+        Raises:
+            OSError: If the source cannot be read
+        """
+        copied = 0
+        buffer = bytearray(TEE_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while fds:
+            n = src_file.readinto(buffer)
+            if not n:
+                break
+            copied += n
+            for i, fd in list(fds.items()):
+                try:
+                    written = 0
+                    while written < n:
+                        written += os.write(fd, view[written:n])
+                except OSError as e:
+                    outcomes[i] = (False, e)
+                    del fds[i]
                     try:
-                        # Create parent directory if it doesn't exist
-                        parent_dir = os.path.dirname(path)
-                        if parent_dir and not os.path.exists(parent_dir):
-                            os.makedirs(parent_dir, exist_ok=True)
-                            self._log(f"  MKDIR: {parent_dir}")
-
-                        # Copy file
-                        shutil.copy2(source_path, path)
-                        recovered_count += 1
-                        space_restored += size_bytes
-                        recovered_files.append(path)
-                        self._log(f"  RECOVERED: {path}")
-
-                    except PermissionError:
-                        failed_recoveries.append((path, "Permission denied"))
-                        self._log(f"  ERROR (permission): {path}")
-                    except OSError as e:
-                        failed_recoveries.append((path, str(e)))
-                        self._log(f"  ERROR ({e}): {path}")
-                    finally:
-                        progress_bar.update(1)
-
-        progress_bar.close()
+                        os.close(fd)
+                    except OSError:
+                        pass
+        return copied
+
+    @staticmethod
+    def _close_destinations(fds: Dict[int, int],
+                            outcomes: List[Optional[Tuple[bool, Optional[OSError]]]]) -> None:
+        """Close the destinations of a tee copy, recording a failed close as the copy's error."""
+        for i, fd in fds.items():
+            try:
+                os.close(fd)
+            except OSError as e:
+                if outcomes[i] is None:
+                    outcomes[i] = (False, e)
+
+    @staticmethod
+    def _is_up_to_date(dst: str, src_stat: os.stat_result) -> bool:
+        """Return True if dst is a regular file with the size and modification time of the source."""
+        try:
+            dst_stat = os.stat(dst)
+        except (OSError, ValueError):
+            return False
+        return (stat.S_ISREG(dst_stat.st_mode) and dst_stat.st_size == src_stat.st_size
+                and abs(dst_stat.st_mtime - src_stat.st_mtime) < 1)
+
+    @staticmethod
+    def _copy_metadata(dst: str, src_stat: os.stat_result) -> None:
+        """Give dst the permission bits and timestamps of the source, like shutil.copystat."""
+        os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+
+    @staticmethod
+    def _kernel_copy(src_fd: int, dst_fd: int, size: int) -> bool:
+        """
+        Copy all data between two file descriptors without passing it through Python.
 
-        # Summary
-        self._log("\n" + "=" * 70)
-        self._log("SUMMARY:")
-        self._log(f"  Files recovered: {recovered_count}")
-        self._log(
-            f"  Space restored: {space_restored:,} bytes ({space_restored / (1024**2):.2f} MB)")
+        Tries copy_file_range (which can reflink on copy-on-write filesystems),
+        then sendfile. A primitive that reports end of file before copying
+        anything from a non-empty source (as copy_file_range does for some
+        virtual filesystems) is treated as unsupported.
 
-        if failed_recoveries:
-            self._log(f"  Failed recoveries: {len(failed_recoveries)}")
-            for path, error in failed_recoveries:
-                self._log(f"    - {path}: {error}")
+        Args:
+            src_fd: Descriptor of the source, positioned at its start
+            dst_fd: Descriptor of the (empty) destination
+            size: Expected size of the source in bytes
 
-        self._log("=" * 70)
+        Returns:
+            True if exactly size bytes were copied, False if neither primitive
+            supports these files or the source changed size while being copied
+        """
+        for use_copy_file_range in (True, False):
+            if use_copy_file_range and not HAS_COPY_FILE_RANGE:
+                continue
+            if not use_copy_file_range and not HAS_SENDFILE:
+                continue
+            copied = 0
+            try:
+                while True:
+                    if use_copy_file_range:
+                        n = os.copy_file_range(src_fd, dst_fd, COPY_BLOCK_SIZE)
+                    else:
+                        n = os.sendfile(dst_fd, src_fd, None, COPY_BLOCK_SIZE)
+                    if n == 0:
+                        if copied == 0 and size > 0:
+                            # Nothing copied from a non-empty file: try the next primitive
+                            break
+                        return copied == size
+                    copied += n
+            except OSError as e:
+                # Only fall back if nothing was written; otherwise it is a real error
+                if copied or e.errno not in _UNSUPPORTED_COPY_ERRNOS:
+                    raise
+        return False
+
+    @staticmethod
+    def _copy_with_stat(src: str, dst: str, src_stat: os.stat_result) -> None:
+        """
+        Copy a file with its permission bits and timestamps, like shutil.copy2.
 
-        return recovered_count, space_restored, recovered_files
+        The data is copied in the kernel (copy_file_range, then sendfile) when
+        possible, falling back to shutil.copy2 otherwise. Extended attributes
+        are not copied on the fast path. The metadata comes from src_stat, so a
+        source copied to several destinations is only stat'ed once.
+
+        Args:
+            src: Path of the file to copy
+            dst: Path of the copy (overwritten if it exists)
+            src_stat: Result of os.stat(src)
+        """
+        if not (HAS_COPY_FILE_RANGE or HAS_SENDFILE) or not stat.S_ISREG(src_stat.st_mode):
+            shutil.copy2(src, dst)
+            return
 
-    def analyze_recovery_impact(self) -> None:
-        """Analyze and display the impact of recovery for matching files."""
+        src_fd = os.open(src, os.O_RDONLY)
+        try:
+            dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                copied = DuplicateRecoverer._kernel_copy(src_fd, dst_fd, src_stat.st_size)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+
+        if not copied:
+            shutil.copy2(src, dst)
+            return
+        DuplicateRecoverer._copy_metadata(dst, src_stat)
+
+    @classmethod
+    def _prefetched(cls, entries: Iterable[Tuple[int, PlannedGroup, Optional[os.stat_result]]]
+                    ) -> Iterator[Tuple[int, PlannedGroup, Optional[os.stat_result]]]:
+        """
+        Yield (number, group, source stat) entries while keeping the reads of the next sources in flight.
+
+        The source of each group is hinted PREFETCH_DEPTH entries before it is
+        yielded (unless the source was not found).
+        """
+        if not HAS_FADVISE:
+            yield from entries
+            return
+
+        entries = iter(entries)
+        window = deque(islice(entries, PREFETCH_DEPTH))
+        for _, group, src_stat in window:
+            if src_stat is not None:
+                cls._prefetch_source(group.source)
+        while window:
+            entry = window.popleft()
+            upcoming = next(entries, None)
+            if upcoming is not None:
+                if upcoming[2] is not None:
+                    cls._prefetch_source(upcoming[1].source)
+                window.append(upcoming)
+            yield entry
+
+    @staticmethod
+    def _source_order(entry: Tuple[int, PlannedGroup, Optional[os.stat_result]]) -> Tuple[int, int]:
+        """Sort key placing groups by the device and inode of their source (missing sources first)."""
+        src_stat = entry[2]
+        if src_stat is None:
+            return -1, -1
+        return src_stat.st_dev, src_stat.st_ino
+
+    @staticmethod
+    def _prefetch_source(source: str) -> None:
+        """Ask the kernel to start reading a group's source file into the page cache."""
+        try:
+            fd = os.open(source, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, PREFETCH_BYTES, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def analyze_recovery_impact(self, plan: RecoveryPlan) -> None:
+        """
+        Analyze and display the impact of recovery for matching files.
+
+        Args:
+            plan: Recovery plan from build_plan
+        """
         self._log_and_print("\n" + "=" * 70)
         self._log_and_print("RECOVERY IMPACT ANALYSIS")
         self._log_and_print("=" * 70)
 
-        matching_groups = self._filter_matching_groups()
-
-        if not matching_groups:
+        if not plan.groups:
             if self.recover_all:
                 self._log_and_print(f"No duplicate groups found")
             else:
@@ -316,35 +1020,14 @@ class DuplicateRecoverer:
             self._log_and_print("=" * 70)
             return
 
-        total_matching_groups = len(matching_groups)
-        total_matching_files = 0
-        total_space_to_restore = 0
-
-        for group in matching_groups:
-            paths = group.get("paths", [])
-            newest_index = group.get("newest_index", 0)
-            size_bytes = group.get("size_bytes", 0)
-
-            # Count files to recover (all except newest, or filtered by search string)
-            if self.recover_all:
-                matching_count = len(paths) - 1  # All except newest
-            else:
-                matching_count = sum(
-                    1 for i, path in enumerate(paths)
-                    if i != newest_index and self.search_string in path.lower()
-                )
-
-            total_matching_files += matching_count
-            total_space_to_restore += matching_count * size_bytes
-
         if self.recover_all:
             self._log_and_print(f"Mode: Recover all files")
         else:
             self._log_and_print(f"Search string: '{self.search_string}'")
-        self._log_and_print(f"Matching duplicate groups: {total_matching_groups}")
-        self._log_and_print(f"Total files to recover: {total_matching_files}")
+        self._log_and_print(f"Matching duplicate groups: {len(plan.groups)}")
+        self._log_and_print(f"Total files to recover: {plan.total_files}")
         self._log_and_print(
-            f"Total space to restore: {total_space_to_restore:,} bytes ({total_space_to_restore / (1024**2):.2f} MB)")
+            f"Total space to restore: {plan.total_space:,} bytes ({plan.total_space / (1024**2):.2f} MB)")
         self._log_and_print("=" * 70)
 
 
@@ -360,20 +1043,25 @@ Description:
 Arguments:
     json_file                Path to the duplicates JSON file from hash_byte_dup_step2.py
     search_string            String to search for in file paths (case-insensitive). Not required if using --recover-all.
+                             Separate several strings with commas to recover paths containing any of them.
 
 Options:
     --recover-all            Recover all duplicate files without filtering (ignores search_string)
     --execute                Actually recover files (requires confirmation)
     --verbose                Print all logging information to console (default: quiet mode)
     --log-file <file>        Specify custom log file path
+    --workers <n>            Number of threads copying files (default: 16)
+    --cache                  Cache the parsed JSON next to it (<json_file>.parsed.pkl) to speed up re-runs
     --help                   Show this help message and exit
 
 Examples:
     python recover_deleted_files_step4.py duplicates_results_duplicates.json python
     python recover_deleted_files_step4.py duplicates_results_duplicates.json python --execute --verbose
     python recover_deleted_files_step4.py duplicates_results_duplicates.json "Documents" --execute
+    python recover_deleted_files_step4.py duplicates_results_duplicates.json "Documents,Pictures"
     python recover_deleted_files_step4.py duplicates_results_duplicates.json --recover-all
     python recover_deleted_files_step4.py duplicates_results_duplicates.json --recover-all --execute --verbose
+    python recover_deleted_files_step4.py duplicates_results_duplicates.json --recover-all --execute --workers 4
 
 Notes:
     - Default behavior is quiet mode with dry-run: previews recoveries without making changes
@@ -385,38 +1073,72 @@ Notes:
     - A confirmation prompt will appear before recovery proceeds (with --execute)
     - All operations are logged to a file regardless of verbose setting
     - Source file (newest copy) must exist for recovery to work
+    - The --cache file is rebuilt automatically when the JSON file changes; only use it
+      with JSON files you trust, since the cache is a pickle file
 """
     print(help_text)
 
 
-def main():
-    """Main function to recover duplicates."""
-    if len(sys.argv) < 2 or "--help" in sys.argv or "-h" in sys.argv:
-        print_help()
-        sys.exit(0 if "--help" in sys.argv or "-h" in sys.argv else 1)
-
-    json_file = sys.argv[1]
-    recover_all = "--recover-all" in sys.argv
-    execute = "--execute" in sys.argv
-    verbose = "--verbose" in sys.argv
-    log_file = None
-    search_string = None
-
-    # Parse positional arguments and options
+def _parse_args(argv: List[str]) -> Tuple[str, Optional[str], bool, bool, bool, bool, Optional[str], int]:
+    """
+    Parse and validate the command line, exiting with an error message if it is invalid.
+
+    Args:
+        argv: Command line arguments (sys.argv)
+
+    Returns:
+        Tuple of (json_file, search_string, recover_all, execute, verbose,
+        use_cache, log_file, workers)
+    """
+    json_file = argv[1]
+    recover_all = False
+    execute = False
+    verbose = False
+    use_cache = False
+    log_file: Optional[str] = None
+    search_string: Optional[str] = None
+    workers = 16
+
+    # Parse positional arguments and options in a single pass, so an option value
+    # (e.g. a log file named like a flag) is never mistaken for a flag
     i = 2
-    while i < len(sys.argv):
-        arg = sys.argv[i]
+    while i < len(argv):
+        arg = argv[i]
 
-        if arg == "--log-file" and i + 1 < len(sys.argv):
-            log_file = sys.argv[i + 1]
+        if arg in ("--log-file", "--workers") and i + 1 >= len(argv):
+            print(f"Error: {arg} requires a value")
+            print("Use --help for usage information")
+            sys.exit(1)
+        elif arg == "--log-file":
+            log_file = argv[i + 1]
+            i += 2
+        elif arg == "--workers":
+            try:
+                workers = int(argv[i + 1])
+            except ValueError:
+                workers = 0
+            if workers < 1:
+                print("Error: --workers must be a positive integer")
+                print("Use --help for usage information")
+                sys.exit(1)
             i += 2
-        elif arg in ("--execute", "--verbose", "--recover-all"):
+        elif arg == "--recover-all":
+            recover_all = True
+            i += 1
+        elif arg == "--execute":
+            execute = True
+            i += 1
+        elif arg == "--verbose":
+            verbose = True
+            i += 1
+        elif arg == "--cache":
+            use_cache = True
             i += 1
         elif arg.startswith("--"):
             print(f"Error: Unknown option '{arg}'")
             print("Use --help for usage information")
             sys.exit(1)
-        elif not recover_all and search_string is None:
+        elif search_string is None:
             # This is the search string argument
             search_string = arg
             i += 1
@@ -425,12 +1147,30 @@ def main():
             print("Use --help for usage information")
             sys.exit(1)
 
+    # With --recover-all no search string is accepted
+    if recover_all and search_string is not None:
+        print(f"Error: Unknown argument '{search_string}'")
+        print("Use --help for usage information")
+        sys.exit(1)
+
     # Validate arguments
     if not recover_all and search_string is None:
         print("Error: search_string is required unless using --recover-all")
         print("Use --help for usage information")
         sys.exit(1)
 
+    return json_file, search_string, recover_all, execute, verbose, use_cache, log_file, workers
+
+
+def main():
+    """Main function to recover duplicates."""
+    show_help = any(arg in ("--help", "-h") for arg in sys.argv)
+    if len(sys.argv) < 2 or show_help:
+        print_help()
+        sys.exit(0 if show_help else 1)
+
+    json_file, search_string, recover_all, execute, verbose, use_cache, log_file, workers = _parse_args(sys.argv)
+
     # Validate JSON file exists
     if not os.path.exists(json_file):
         print(f"Error: JSON file '{json_file}' not found")
@@ -445,31 +1185,36 @@ def main():
 
     # Initialize recoverer
     recoverer = DuplicateRecoverer(json_file, search_string, dry_run=not execute,
-                                   log_file=log_file, verbose=verbose, recover_all=recover_all)
-
-    # Analyze recovery impact
-    recoverer.analyze_recovery_impact()
-
-    # Preview or execute recoveries
-    if execute:
-        if verbose:
-            print("\nPreparing to execute recovery...\n")
-        recovered_count, space_restored, recovered_files = recoverer.recover_duplicates(
-            confirm=True)
-    else:
-        if verbose:
-            print("\nDRY-RUN MODE (preview only, no files will be recovered)\n")
-        else:
-            print("\nDRY-RUN MODE: No files will be recovered")
-        recovered_count, space_restored, recovered_files = recoverer.recover_duplicates(
-            confirm=False)
-        if verbose:
-            print("\nTo actually recover files, use: --execute flag")
+                                   log_file=log_file, verbose=verbose, recover_all=recover_all,
+                                   use_cache=use_cache, workers=workers)
+
+    try:
+        # Select the files to recover once; analysis, preview and recovery share the plan
+        plan = recoverer.build_plan()
+
+        # Analyze recovery impact
+        recoverer.analyze_recovery_impact(plan)
+
+        # Preview or execute recoveries
+        if execute:
+            if verbose:
+                print("\nPreparing to execute recovery...\n")
+            recovered_count, space_restored, recovered_files = recoverer.recover_duplicates(
+                plan, confirm=True)
         else:
-            print("Use --verbose --execute to see details and recover files")
-
-    # Save log
-    recoverer.save_log()
+            if verbose:
+                print("\nDRY-RUN MODE (preview only, no files will be recovered)\n")
+            else:
+                print("\nDRY-RUN MODE: No files will be recovered")
+            recovered_count, space_restored, recovered_files = recoverer.recover_duplicates(
+                plan, confirm=False)
+            if verbose:
+                print("\nTo actually recover files, use: --execute flag")
+            else:
+                print("Use --verbose --execute to see details and recover files")
+    finally:
+        # Save log (also when interrupted, so completed recoveries stay recorded)
+        recoverer.save_log()
 
 
 if __name__ == "__main__":
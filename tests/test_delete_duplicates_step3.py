@@ -0,0 +1,102 @@
+"""
+Tests for delete_duplicates_step3.py.
+
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import delete_duplicates_step3  # noqa: E402
+from delete_duplicates_step3 import DuplicateDeleter  # noqa: E402
+
+
+class InterruptedDeletionTest(unittest.TestCase):
+    """An interrupted run must log every file it actually deleted."""
+
+    GROUPS = 40
+    COPIES = 5
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        duplicates = []
+        for g in range(self.GROUPS):
+            paths = []
+            for c in range(self.COPIES):
+                folder = os.path.join(self.root, "tree", f"d{c}")
+                os.makedirs(folder, exist_ok=True)
+                path = os.path.join(folder, f"file{g}.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"group {g}")
+                paths.append(path)
+            duplicates.append({
+                "filename": f"file{g}.txt",
+                "extension": "txt",
+                "size_bytes": len(f"group {g}"),
+                "file_count": self.COPIES,
+                "wasted_space_bytes": (self.COPIES - 1) * len(f"group {g}"),
+                "newest_index": 0,
+                "paths": paths,
+                "dates": ["" for _ in paths],
+            })
+        self.all_paths = [path for group in duplicates for path in group["paths"]]
+        self.json_file = os.path.join(self.root, "duplicates.json")
+        with open(self.json_file, "w", encoding="utf-8") as f:
+            json.dump({"total_groups": len(duplicates), "duplicates": duplicates}, f, indent=2)
+        self.log_file = os.path.join(self.root, "delete.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run_interrupted(self, streamed: bool) -> None:
+        """Interrupt delete_duplicates right after its second DELETED log line."""
+        deleter = DuplicateDeleter(self.json_file, dry_run=False, log_file=self.log_file,
+                                   workers=4)
+        if not streamed:
+            # Same path as without ijson: the groups are loaded into memory up front
+            deleter._groups = deleter._load_json()["duplicates"]
+        self.assertEqual(streamed, deleter._groups is None)
+
+        log = deleter._log
+        deleted_lines = 0
+
+        def interrupting_log(message: str) -> None:
+            nonlocal deleted_lines
+            log(message)
+            if "DELETED:" in message:
+                deleted_lines += 1
+                if deleted_lines == 2:
+                    raise KeyboardInterrupt
+
+        deleter._log = interrupting_log
+        try:
+            with self.assertRaises(KeyboardInterrupt):
+                deleter.delete_duplicates(confirm=False)
+        finally:
+            deleter.save_log()
+
+        with open(self.log_file, encoding="utf-8") as f:
+            logged = [line.split("DELETED: ", 1)[1] for line in f.read().splitlines()
+                      if "DELETED: " in line]
+        removed = [path for path in self.all_paths if not os.path.exists(path)]
+
+        self.assertGreaterEqual(len(removed), 2)
+        self.assertEqual(sorted(removed), sorted(logged))
+        self.assertEqual(len(logged), len(set(logged)))
+
+    @unittest.skipUnless(delete_duplicates_step3.HAS_IJSON, "requires ijson")
+    def test_streamed_groups(self):
+        self._run_interrupted(streamed=True)
+
+    def test_groups_in_memory(self):
+        self._run_interrupted(streamed=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests for recover_deleted_files_step4.py.
+
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recover_deleted_files_step4 import DuplicateRecoverer  # noqa: E402
+
+
+class InterruptedRecoveryTest(unittest.TestCase):
+    """An interrupted run must log every file it actually recovered."""
+
+    GROUPS = 40
+    COPIES = 5
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        duplicates = []
+        self.targets = []
+        for g in range(self.GROUPS):
+            paths = []
+            for c in range(self.COPIES):
+                folder = os.path.join(self.root, "tree", f"d{c}")
+                os.makedirs(folder, exist_ok=True)
+                paths.append(os.path.join(folder, f"file{g}.txt"))
+            # Only the newest copy is left; the others are to be recovered
+            with open(paths[0], "w", encoding="utf-8") as f:
+                f.write(f"group {g}")
+            self.targets.extend(paths[1:])
+            duplicates.append({
+                "filename": f"file{g}",
+                "extension": "txt",
+                "size_bytes": len(f"group {g}"),
+                "file_count": self.COPIES,
+                "wasted_space_bytes": (self.COPIES - 1) * len(f"group {g}"),
+                "newest_index": 0,
+                "paths": paths,
+                "dates": ["" for _ in paths],
+            })
+        self.json_file = os.path.join(self.root, "duplicates.json")
+        with open(self.json_file, "w", encoding="utf-8") as f:
+            json.dump({"total_groups": len(duplicates), "duplicates": duplicates}, f, indent=2)
+        self.log_file = os.path.join(self.root, "recover.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_interrupted_recovery(self):
+        """Interrupt recover_duplicates right after its second RECOVERED log line."""
+        recoverer = DuplicateRecoverer(self.json_file, dry_run=False, log_file=self.log_file,
+                                       verbose=True, recover_all=True, workers=4)
+        plan = recoverer.build_plan()
+        self.assertEqual(plan.total_files, len(self.targets))
+
+        log = recoverer._log
+        recovered_lines = 0
+
+        def interrupting_log(message: str) -> None:
+            nonlocal recovered_lines
+            log(message)
+            if "RECOVERED:" in message:
+                recovered_lines += 1
+                if recovered_lines == 2:
+                    raise KeyboardInterrupt
+
+        recoverer._log = interrupting_log
+        try:
+            with self.assertRaises(KeyboardInterrupt):
+                recoverer.recover_duplicates(plan, confirm=False)
+        finally:
+            recoverer.save_log()
+
+        with open(self.log_file, encoding="utf-8") as f:
+            logged = [line.split("RECOVERED: ", 1)[1] for line in f.read().splitlines()
+                      if "RECOVERED: " in line]
+        copied = [path for path in self.targets if os.path.exists(path)]
+
+        self.assertGreaterEqual(len(copied), 2)
+        self.assertEqual(sorted(copied), sorted(logged))
+        self.assertEqual(len(logged), len(set(logged)))
+
+
+if __name__ == "__main__":
+    unittest.main()